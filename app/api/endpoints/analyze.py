@@ -0,0 +1,54 @@
+from fastapi import APIRouter, HTTPException
+from datetime import datetime
+import os
+import time
+
+from ..schemas import APIResponse, AnalyzeRequest
+
+router = APIRouter(tags=["analyze"])
+
+# Upper bound on texts per request so one client cannot monopolize a batch window
+ANALYZE_MAX_TEXTS = int(os.getenv('ANALYZE_MAX_TEXTS', '256'))
+
+@router.post("/analyze", response_model=APIResponse)
+async def analyze_texts(request: AnalyzeRequest):
+    """Run emotion, intent and sarcasm analysis on one or more texts"""
+    texts = list(request.texts or [])
+    if request.text is not None:
+        texts.insert(0, request.text)
+    if not texts:
+        raise HTTPException(status_code=400, detail="Provide 'text' or a non-empty 'texts' list")
+    if len(texts) > ANALYZE_MAX_TEXTS:
+        raise HTTPException(status_code=400, detail=f"At most {ANALYZE_MAX_TEXTS} texts per request")
+
+    try:
+        # Lazy import to avoid loading NLP models at startup
+        from app.nlp.server import get_inference_server
+
+        start = time.time()
+        results = await get_inference_server().analyze(texts)
+        return APIResponse(
+            success=True,
+            message=f"Analyzed {len(texts)} texts",
+            data={
+                "results": results,
+                # Texts the models failed on are returned as null
+                "failed": sum(1 for result in results if result is None),
+                "latency_ms": round((time.time() - start) * 1000, 1),
+                "timestamp": datetime.now().isoformat()
+            },
+            count=len(results)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@router.get("/analyze/stats", response_model=APIResponse)
+async def get_analyze_stats():
+    """Get batching statistics of the inference server"""
+    from app.nlp.server import get_inference_server
+
+    return APIResponse(
+        success=True,
+        message="Inference server stats retrieved",
+        data={**get_inference_server().get_stats(), "timestamp": datetime.now().isoformat()}
+    )
@@ -181,78 +181,26 @@ async def stream_live_data():
     )
 
 @router.post("/stream/fetch", response_model=APIResponse)
-async def fetch_single_subreddit(subreddit: str = Query(..., description="Subreddit name to fetch")):
-    """Fetch data from a single subreddit"""
+async def fetch_single_subreddit(background_tasks: BackgroundTasks,
+                                 subreddit: str = Query(..., description="Subreddit name to fetch")):
+    """Start a background fetch of a subreddit's hot posts and comments; returns a job id"""
     try:
+        from app.reddit.fetch_jobs import create_job, run_fetch_job
+
         reddit = get_reddit_client()
         collection = get_mongodb_client()
-        
-        # Get initial count
-        initial_count = collection.count_documents({})
-        
-        # Fetch data from subreddit
-        subreddit_obj = reddit.subreddit(subreddit)
-        posts_processed = 0
-        comments_processed = 0
-        
-        # Process hot posts
-        for submission in subreddit_obj.hot(limit=10):
-            post_data = {
-                'type': 'post',
-                'subreddit': subreddit,
-                'id': submission.id,
-                'author': str(submission.author) if submission.author else '[deleted]',
-                'title': submission.title,
-                'body': submission.selftext,
-                'created_utc': submission.created_utc,
-                'url': submission.url,
-                'score': submission.score,
-                'num_comments': submission.num_comments,
-                'fetched_at': time.time()
-            }
-            
-            # Save to MongoDB
-            collection.update_one(
-                {'id': post_data['id'], 'type': 'post'}, 
-                {'$set': post_data}, 
-                upsert=True
-            )
-            posts_processed += 1
-            
-            # Process comments
-            submission.comments.replace_more(limit=0)
-            for comment in submission.comments.list()[:5]:  # Get first 5 comments
-                comment_data = {
-                    'type': 'comment',
-                    'subreddit': subreddit,
-                    'post_id': submission.id,
-                    'id': comment.id,
-                    'author': str(comment.author) if comment.author else '[deleted]',
-                    'body': comment.body,
-                    'created_utc': comment.created_utc,
-                    'score': comment.score,
-                    'fetched_at': time.time()
-                }
-                
-                collection.update_one(
-                    {'id': comment_data['id'], 'type': 'comment'}, 
-                    {'$set': comment_data}, 
-                    upsert=True
-                )
-                comments_processed += 1
-        
-        # Get final count
-        final_count = collection.count_documents({})
-        
+
+        # Fetching, comment expansion, NLP and writes all run off the event loop
+        job_id = create_job(subreddit, post_limit=10, comments_per_post=5)
+        background_tasks.add_task(run_fetch_job, job_id, subreddit, reddit, collection)
+
         return APIResponse(
             success=True,
-            message=f"Successfully fetched data from r/{subreddit}",
+            message=f"Fetch of r/{subreddit} started",
             data={
+                "job_id": job_id,
                 "subreddit": subreddit,
-                "posts_processed": posts_processed,
-                "comments_processed": comments_processed,
-                "total_processed": posts_processed + comments_processed,
-                "documents_added": final_count - initial_count,
+                "status": "queued",
                 "timestamp": datetime.now().isoformat()
             }
         )
@@ -263,6 +211,20 @@ async def fetch_single_subreddit(subreddit: str = Query(..., description="Subred
             data={"subreddit": subreddit, "timestamp": datetime.now().isoformat()}
         )
 
+@router.get("/stream/fetch/{job_id}", response_model=APIResponse)
+async def get_fetch_job(job_id: str):
+    """Get the status and counters of a /stream/fetch job"""
+    from app.reddit.fetch_jobs import get_job
+
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Fetch job {job_id} not found")
+    return APIResponse(
+        success=job['status'] != 'failed',
+        message=f"Fetch job {job['status']}",
+        data={**job, "timestamp": datetime.now().isoformat()}
+    )
+
 @router.get("/stream/analytics", response_model=APIResponse)
 async def get_streaming_analytics():
     """Get analytics about the streaming data"""
@@ -332,5 +294,83 @@ async def get_streaming_analytics():
             data={"timestamp": datetime.now().isoformat()}
         )
 
+@router.get("/nlp/models", response_model=APIResponse)
+async def get_nlp_model_stats():
+    """Get load time and memory footprint of the NLP models loaded in this process"""
+    try:
+        # Lazy import to avoid loading NLP models at startup
+        from app.nlp.summarizer import get_model_stats
+
+        stats = get_model_stats()
+        return APIResponse(
+            success=True,
+            message="NLP model stats retrieved",
+            data={**stats, "timestamp": datetime.now().isoformat()}
+        )
+    except Exception as e:
+        return APIResponse(
+            success=False,
+            message=f"Failed to get NLP model stats: {str(e)}",
+            data={"timestamp": datetime.now().isoformat()}
+        )
+
+@router.get("/nlp/cache", response_model=APIResponse)
+async def get_nlp_cache_stats():
+    """Get hit/miss counters of the NLP inference cache in this process"""
+    try:
+        from app.nlp.cache import get_inference_cache
+
+        cache = get_inference_cache()
+        return APIResponse(
+            success=True,
+            message="NLP cache stats retrieved" if cache else "NLP cache is disabled",
+            data={
+                **(cache.get_stats() if cache else {"enabled": False}),
+                "timestamp": datetime.now().isoformat()
+            }
+        )
+    except Exception as e:
+        return APIResponse(
+            success=False,
+            message=f"Failed to get NLP cache stats: {str(e)}",
+            data={"timestamp": datetime.now().isoformat()}
+        )
+
+@router.get("/nlp/cascade", response_model=APIResponse)
+async def get_nlp_cascade_stats():
+    """Get the share of traffic answered by the fast tier vs the transformer, per head"""
+    try:
+        from app.nlp.cascade import get_cascade_stats
+
+        return APIResponse(
+            success=True,
+            message="NLP cascade stats retrieved",
+            data={**get_cascade_stats(), "timestamp": datetime.now().isoformat()}
+        )
+    except Exception as e:
+        return APIResponse(
+            success=False,
+            message=f"Failed to get NLP cascade stats: {str(e)}",
+            data={"timestamp": datetime.now().isoformat()}
+        )
+
+@router.get("/nlp/padding", response_model=APIResponse)
+async def get_nlp_padding_stats():
+    """Get real vs padded tokens of the length-bucketed NLP batches in this process"""
+    try:
+        from app.nlp.batching import get_padding_stats
+
+        return APIResponse(
+            success=True,
+            message="NLP padding stats retrieved",
+            data={**get_padding_stats(), "timestamp": datetime.now().isoformat()}
+        )
+    except Exception as e:
+        return APIResponse(
+            success=False,
+            message=f"Failed to get NLP padding stats: {str(e)}",
+            data={"timestamp": datetime.now().isoformat()}
+        )
+
 # Import asyncio for the streaming endpoint
 import asyncio
@@ -17,9 +17,9 @@ class RedditPost(BaseModel):
     fetched_at: float = Field(..., description="When data was fetched")
     
     # NLP Analysis Results
-    emotion: Optional[Dict[str, Any]] = Field(None, description="Emotion analysis results")
-    intent: Optional[Dict[str, Any]] = Field(None, description="Intent classification results")
-    sarcasm: Optional[Dict[str, Any]] = Field(None, description="Sarcasm detection results")
+    emotion: Optional[Dict[str, Any]] = Field(None, description="Emotion analysis results (label, score, scores)")
+    intent: Optional[Dict[str, Any]] = Field(None, description="Intent classification results (label, score, scores)")
+    sarcasm: Optional[Dict[str, Any]] = Field(None, description="Sarcasm proxy and sentiment scores (is_sarcastic, label, score, scores)")
 
 class RedditComment(BaseModel):
     """Schema for Reddit comment data"""
@@ -34,9 +34,9 @@ class RedditComment(BaseModel):
     fetched_at: float = Field(..., description="When data was fetched")
     
     # NLP Analysis Results
-    emotion: Optional[Dict[str, Any]] = Field(None, description="Emotion analysis results")
-    intent: Optional[Dict[str, Any]] = Field(None, description="Intent classification results")
-    sarcasm: Optional[Dict[str, Any]] = Field(None, description="Sarcasm detection results")
+    emotion: Optional[Dict[str, Any]] = Field(None, description="Emotion analysis results (label, score, scores)")
+    intent: Optional[Dict[str, Any]] = Field(None, description="Intent classification results (label, score, scores)")
+    sarcasm: Optional[Dict[str, Any]] = Field(None, description="Sarcasm proxy and sentiment scores (is_sarcastic, label, score, scores)")
 
 class RedditContent(BaseModel):
     """Schema for generic Reddit content (post or comment)"""
@@ -51,9 +51,9 @@ class RedditContent(BaseModel):
     fetched_at: float = Field(..., description="When data was fetched")
     
     # NLP Analysis Results
-    emotion: Optional[Dict[str, Any]] = Field(None, description="Emotion analysis results")
-    intent: Optional[Dict[str, Any]] = Field(None, description="Intent classification results")
-    sarcasm: Optional[Dict[str, Any]] = Field(None, description="Sarcasm detection results")
+    emotion: Optional[Dict[str, Any]] = Field(None, description="Emotion analysis results (label, score, scores)")
+    intent: Optional[Dict[str, Any]] = Field(None, description="Intent classification results (label, score, scores)")
+    sarcasm: Optional[Dict[str, Any]] = Field(None, description="Sarcasm proxy and sentiment scores (is_sarcastic, label, score, scores)")
 
 class SystemStats(BaseModel):
     """Schema for system statistics"""
@@ -93,6 +93,11 @@ class SearchQuery(BaseModel):
     limit: int = Field(default=100, description="Number of results to return")
     skip: int = Field(default=0, description="Number of results to skip")
 
+class AnalyzeRequest(BaseModel):
+    """Schema for on-demand NLP analysis requests"""
+    text: Optional[str] = Field(None, description="Single text to analyze")
+    texts: Optional[List[str]] = Field(None, description="Texts to analyze in bulk")
+
 class APIResponse(BaseModel):
     """Schema for API responses"""
     success: bool = Field(..., description="Request success status")
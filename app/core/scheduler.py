@@ -0,0 +1,217 @@
+"""
+Adaptive per-subreddit polling.
+
+Each subreddit gets its own deadline. Its arrival rate (items/second, per
+listing) is learned from the created_utc of what every poll returns, and the
+poll interval and page sizes follow from it: busy subreddits are polled often
+with pages deep enough not to drop items, quiet ones rarely with small pages.
+Due subreddits are fetched together, with at most SCHEDULER_MAX_CONCURRENCY
+in flight, and the whole schedule is stretched if it would overrun Reddit's
+request budget.
+"""
+import math
+import os
+import time
+from app.reddit.rate_limit import REDDIT_REQUESTS_PER_MINUTE, listing_requests
+
+SCHEDULER_MIN_INTERVAL = float(os.getenv('SCHEDULER_MIN_INTERVAL', '30'))
+SCHEDULER_MAX_INTERVAL = float(os.getenv('SCHEDULER_MAX_INTERVAL', '900'))
+# Interval is chosen so the busier listing collects about this many items per poll
+SCHEDULER_TARGET_ITEMS = int(os.getenv('SCHEDULER_TARGET_ITEMS', '50'))
+# Page size = expected arrivals per interval x headroom
+SCHEDULER_HEADROOM = float(os.getenv('SCHEDULER_HEADROOM', '1.5'))
+SCHEDULER_MIN_PAGE = int(os.getenv('SCHEDULER_MIN_PAGE', '5'))
+SCHEDULER_MAX_PAGE = int(os.getenv('SCHEDULER_MAX_PAGE', '300'))
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv('SCHEDULER_MAX_CONCURRENCY', '8'))
+# Share of the Reddit request budget the schedule may plan to use
+SCHEDULER_BUDGET_SHARE = float(os.getenv('SCHEDULER_BUDGET_SHARE', '0.8'))
+SCHEDULER_RATE_ALPHA = float(os.getenv('SCHEDULER_RATE_ALPHA', '0.3'))
+
+STREAMS = ('posts', 'comments')
+
+def observed_rate(created, limit, since, now):
+    """
+    Arrival rate (items/s) shown by one poll's created_utc values, and whether
+    the page was saturated (full of new items, so some were probably missed
+    and the rate is a lower bound). None when the poll tells nothing.
+    """
+    if since is None:
+        # First poll: the span of the page itself
+        if not created:
+            return None, False
+        return len(created) / max(now - min(created), 1.0), len(created) >= limit
+
+    new = [c for c in created if c > since]
+    saturated = len(created) >= limit and len(new) == len(created)
+    if saturated:
+        return len(new) / max(now - min(new), 1.0), True
+    return len(new) / max(now - since, 1.0), False
+
+class SubredditSchedule:
+    """Learned rates, interval, page sizes and next deadline of one subreddit."""
+
+    def __init__(self, name, post_limit, comment_limit):
+        self.name = name
+        self.rates = {'posts': None, 'comments': None}
+        self.limits = {'posts': post_limit, 'comments': comment_limit}
+        self.interval = SCHEDULER_MIN_INTERVAL
+        self.next_due = 0.0
+        self.last_polled = None
+        self.polls = 0
+        self.saturated = 0
+
+    def record(self, arrivals, now):
+        """Update rates from a poll's created_utc values and plan the next poll."""
+        saturated_any = False
+        for stream in STREAMS:
+            rate, saturated = observed_rate(arrivals.get(stream, []), self.limits[stream], self.last_polled, now)
+            if rate is None:
+                continue
+            previous = self.rates[stream]
+            if previous is None:
+                self.rates[stream] = rate
+            elif saturated:
+                # A full page only bounds the rate from below; never average it down
+                self.rates[stream] = max(rate, previous)
+            else:
+                self.rates[stream] = SCHEDULER_RATE_ALPHA * rate + (1 - SCHEDULER_RATE_ALPHA) * previous
+            saturated_any = saturated_any or saturated
+
+        self.polls += 1
+        self.saturated += saturated_any
+        self.last_polled = now
+        self.plan()
+        self.next_due = now + self.interval
+
+    def plan(self, stretch=1.0):
+        """Interval from the busier listing's rate, then page sizes to cover it."""
+        fastest = max((rate for rate in self.rates.values() if rate), default=0.0)
+        interval = SCHEDULER_TARGET_ITEMS / fastest if fastest else SCHEDULER_MAX_INTERVAL
+        self.interval = min(max(interval * stretch, SCHEDULER_MIN_INTERVAL), SCHEDULER_MAX_INTERVAL)
+        for stream, rate in self.rates.items():
+            if rate is None:
+                continue
+            expected = math.ceil(rate * self.interval * SCHEDULER_HEADROOM)
+            self.limits[stream] = min(max(expected, SCHEDULER_MIN_PAGE), SCHEDULER_MAX_PAGE)
+
+    def requests_per_minute(self):
+        """Reddit requests this schedule costs per minute."""
+        per_poll = sum(listing_requests(limit) for limit in self.limits.values())
+        return per_poll * 60.0 / self.interval
+
+    def get_stats(self):
+        return {
+            'interval': round(self.interval, 1),
+            'next_due_in': round(max(self.next_due - time.time(), 0.0), 1),
+            'rates_per_min': {s: round(r * 60, 2) if r is not None else None for s, r in self.rates.items()},
+            'limits': dict(self.limits),
+            'polls': self.polls,
+            'saturated': self.saturated,
+        }
+
+class AdaptiveScheduler:
+    """Per-subreddit deadlines over one shared fetch pipeline."""
+
+    def __init__(self, subreddits, post_limit=10, comment_limit=20, max_concurrency=SCHEDULER_MAX_CONCURRENCY,
+                 requests_per_minute=REDDIT_REQUESTS_PER_MINUTE * SCHEDULER_BUDGET_SHARE):
+        self.schedules = {name: SubredditSchedule(name, post_limit, comment_limit) for name in subreddits}
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.stretch = 1.0
+
+    def due(self, now=None):
+        """Subreddits whose deadline has passed, most overdue first."""
+        now = now if now is not None else time.time()
+        due = [s for s in self.schedules.values() if s.next_due <= now]
+        return [s.name for s in sorted(due, key=lambda s: s.next_due)]
+
+    def next_deadline(self, names=None):
+        names = self.schedules if names is None else names
+        return min((self.schedules[name].next_due for name in names), default=time.time() + SCHEDULER_MIN_INTERVAL)
+
+    def limits(self, names):
+        """(post_limit, comment_limit) for each subreddit, as fetch_reddit_data expects."""
+        return {name: (self.schedules[name].limits['posts'], self.schedules[name].limits['comments'])
+                for name in names}
+
+    def record(self, arrivals, now=None):
+        """Feed back what a poll returned ({subreddit: {'posts': [...], 'comments': [...]}})."""
+        now = now if now is not None else time.time()
+        for name, sub_arrivals in arrivals.items():
+            if name in self.schedules:
+                self.schedules[name].record(sub_arrivals, now)
+        self.fit_budget()
+
+    def fit_budget(self):
+        """Stretch every interval evenly if the planned polls would exceed the request budget."""
+        for schedule in self.schedules.values():
+            schedule.plan()
+        planned = sum(s.requests_per_minute() for s in self.schedules.values())
+        self.stretch = max(1.0, planned / self.requests_per_minute) if self.requests_per_minute else 1.0
+        if self.stretch > 1.0:
+            for schedule in self.schedules.values():
+                schedule.plan(self.stretch)
+                if schedule.last_polled is not None:
+                    schedule.next_due = schedule.last_polled + schedule.interval
+
+    def get_stats(self):
+        return {
+            'subreddits': len(self.schedules),
+            'planned_requests_per_minute': round(sum(s.requests_per_minute() for s in self.schedules.values()), 1),
+            'budget_requests_per_minute': self.requests_per_minute,
+            'stretch': round(self.stretch, 2),
+            'schedules': {name: s.get_stats() for name, s in self.schedules.items()},
+        }
+
+def run_scheduler(subreddits, reddit_client, mongo_uri, db_name, collection_name, use_redis=True,
+                  scheduler=None, shard=None):
+    """
+    Poll subreddits forever, each on its own adaptive deadline. With a
+    ShardCoordinator only the subreddits this node holds leases for are polled.
+    """
+    from app.reddit.processor import connect_collection, connect_redis, process_and_store
+
+    scheduler = scheduler or AdaptiveScheduler(subreddits)
+    # One MongoDB client and Redis manager for every cycle
+    collection = connect_collection(mongo_uri, db_name, collection_name)
+    redis_manager = connect_redis(use_redis)
+    cycle = 1
+    while True:
+        due = scheduler.due()
+        owned = None
+        if shard is not None:
+            owned = shard.owned()
+            due = [name for name in due if name in owned]
+        if not due:
+            time.sleep(min(max(scheduler.next_deadline(owned) - time.time(), 1.0), SCHEDULER_MIN_INTERVAL))
+            continue
+
+        print(f"\n🔄 CYCLE {cycle} - {time.strftime('%Y-%m-%d %H:%M:%S')} | {len(due)} subreddits due")
+        print(f"{'='*60}")
+        started = time.time()
+        try:
+            arrivals = process_and_store(
+                due,
+                reddit_client,
+                mongo_uri,
+                db_name,
+                collection_name,
+                use_redis=redis_manager is not None,
+                limits=scheduler.limits(due),
+                concurrency=scheduler.max_concurrency,
+                collection=collection,
+                redis_manager=redis_manager
+            )
+            scheduler.record(arrivals or {}, now=started)
+        except Exception as e:
+            print(f"❌ Error in cycle {cycle}: {e}")
+            # Back off the failed subreddits instead of retrying them in a tight loop
+            for name in due:
+                scheduler.schedules[name].next_due = time.time() + SCHEDULER_MIN_INTERVAL
+
+        stats = scheduler.get_stats()
+        busiest = sorted(scheduler.schedules.values(), key=lambda s: s.interval)[:3]
+        print(f"⏰ Planned {stats['planned_requests_per_minute']} req/min "
+              f"(budget {stats['budget_requests_per_minute']:.0f}, stretch x{stats['stretch']}) | shortest intervals: "
+              + ", ".join(f"r/{s.name} {s.interval:.0f}s" for s in busiest))
+        cycle += 1
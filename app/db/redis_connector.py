@@ -22,11 +22,12 @@ class RedisStreamManager:
         self.streams = streams or {
             'posts': 'reddit:posts',
             'comments': 'reddit:comments',
-            'processed': 'reddit:processed'
+            'processed': 'reddit:processed',
+            'rejected': 'reddit:rejected'
         }
         
-    def add_to_stream(self, stream_type: str, data: Dict[str, Any]) -> str:
-        """Add data to a Redis stream"""
+    def add_to_stream(self, stream_type: str, data: Dict[str, Any], maxlen: Optional[int] = None) -> str:
+        """Add data to a Redis stream, optionally capped at ~maxlen entries"""
         try:
             stream_name = self.streams.get(stream_type)
             if not stream_name:
@@ -40,7 +41,10 @@ class RedisStreamManager:
             }
             
             # Add to stream
-            message_id = self.redis_client.xadd(stream_name, stream_data)
+            if maxlen:
+                message_id = self.redis_client.xadd(stream_name, stream_data, maxlen=maxlen, approximate=True)
+            else:
+                message_id = self.redis_client.xadd(stream_name, stream_data)
             print(f"✅ Added to {stream_name}: {message_id}")
             return message_id
             
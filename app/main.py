@@ -3,10 +3,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 import os
+import sys
 from pathlib import Path
 from app.api.endpoints import user
 
-from app.api.endpoints import query, stream
+from app.api.endpoints import query, stream, analyze
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.docs import get_redoc_html
 
@@ -32,6 +33,15 @@ app.add_middleware(
 app.include_router(query.router, prefix="/api/v1")
 app.include_router(stream.router, prefix="/api/v1")
 app.include_router(user.router, prefix="/api/v1")
+app.include_router(analyze.router, prefix="/api/v1")
+
+@app.on_event("shutdown")
+async def shutdown_nlp():
+    """Stop the inference server's batching task and executor, if it was started"""
+    # Only if the NLP stack was actually loaded; don't import it just to shut down
+    server = sys.modules.get("app.nlp.server")
+    if server is not None:
+        await server.shutdown_inference_server()
 
 # Create static files directory if it doesn't exist
 static_dir = Path("static")
@@ -184,7 +194,7 @@ async def root():
 
                 try {
                     const response = await axios.post(`${API_BASE}/stream/fetch?subreddit=${subreddit}`);
-                    alert(`Successfully fetched data from r/${subreddit}!`);
+                    alert(`Started fetching r/${subreddit} (job ${response.data.data.job_id})`);
                     getStats();
                     getRecentData();
                 } catch (error) {
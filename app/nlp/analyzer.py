@@ -0,0 +1,70 @@
+from app.nlp import emotion, intent, sarcasm
+from app.nlp.batching import NLP_FORWARD_BATCH
+from app.nlp.cache import content_hash, get_inference_cache
+from app.nlp.cascade import fast_predict
+from app.nlp.summarizer import summarize_text
+from app.utils.cleaner import clean_text
+
+def empty_result():
+    """Results for empty input, matching the per-module fallbacks."""
+    return {
+        'emotion': emotion.default_result(),
+        'intent': intent.default_result(),
+        'sarcasm': sarcasm.default_result(),
+    }
+
+def analyze(text):
+    """Run every NLP head on a text, summarizing it at most once; None if the models failed."""
+    return analyze_batch([clean_text(text)], batch_size=1)[0]
+
+def _run_heads(texts, batch_size):
+    """Run the classifiers on (cleaned) texts that missed the cache."""
+    # Cheap tier first: only texts some head still needs a transformer for
+    # are summarized, and each is summarized once for all heads
+    indices = [i for i, text in enumerate(texts) if text]
+    fast = {name: fast_predict(name, texts, indices) for name in ('emotion', 'intent', 'sarcasm')}
+    needed = set().union(*(remaining for _, remaining in fast.values()))
+    processed = [summarize_text(text) if i in needed else text for i, text in enumerate(texts)]
+    emotions = emotion.detect_emotion_batch(processed, batch_size=batch_size, summarize=False,
+                                            answered=fast['emotion'][0])
+    intents = intent.detect_intent_batch(processed, batch_size=batch_size, summarize=False,
+                                         answered=fast['intent'][0])
+    sarcasms = sarcasm.is_sarcastic_batch(processed, batch_size=batch_size, summarize=False,
+                                          answered=fast['sarcasm'][0])
+    # A text any head failed on gets None rather than a partly default result
+    return [
+        {'emotion': e, 'intent': i, 'sarcasm': s} if None not in (e, i, s) else None
+        for e, i, s in zip(emotions, intents, sarcasms)
+    ]
+
+def analyze_batch(texts, batch_size=NLP_FORWARD_BATCH, hashes=None):
+    """
+    Run every NLP head on a list of texts already passed through clean_text,
+    using the batch classifiers. `hashes` are their content hashes if the
+    caller has them. Texts the models failed on come back as None and are
+    not cached.
+    """
+    results = [empty_result() if not text else None for text in texts]
+    pending = [i for i, text in enumerate(texts) if text]
+    if not pending:
+        return results
+
+    # Serve repeated texts (copypasta, bot replies, crossposts) from the cache
+    cache = get_inference_cache()
+    if cache is not None:
+        if hashes is None:
+            hashes = [content_hash(text) if text else None for text in texts]
+        cached = cache.get_many([hashes[i] for i in pending])
+        for i, result in zip(pending, cached):
+            results[i] = result
+        pending = [i for i in pending if results[i] is None]
+
+    if pending:
+        computed = _run_heads([texts[i] for i in pending], batch_size)
+        for i, result in zip(pending, computed):
+            results[i] = result
+        if cache is not None:
+            analyzed = [(hashes[i], result) for i, result in zip(pending, computed) if result is not None]
+            cache.set_many([text_hash for text_hash, _ in analyzed], [result for _, result in analyzed])
+
+    return results
@@ -0,0 +1,141 @@
+"""
+Resumable bulk re-analysis of stored posts and comments.
+
+Re-scores every document whose `nlp_version` differs from the current
+summarizer.model_version(), walking the collection in _id order with a
+batched cursor and writing results with unordered bulk updates. The last
+processed _id is checkpointed after every batch, so a restarted job
+resumes where it stopped.
+
+Usage:
+    python -m app.nlp.backfill              # run / resume
+    python -m app.nlp.backfill --restart    # ignore the checkpoint
+"""
+import os
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from app.db.connector import get_db
+from app.nlp.analyzer import analyze_batch
+from app.nlp.batching import NLP_FORWARD_BATCH
+from app.nlp.cache import content_hash
+from app.nlp.summarizer import model_version
+from app.nlp.worker_pool import start_worker_pool
+from app.utils.cleaner import clean_text
+
+load_dotenv()
+
+BACKFILL_BATCH_SIZE = int(os.getenv('BACKFILL_BATCH_SIZE', '256'))
+BACKFILL_REPORT_EVERY = float(os.getenv('BACKFILL_REPORT_EVERY', '10'))
+CHECKPOINT_COLLECTION = os.getenv('BACKFILL_CHECKPOINT_COLLECTION', 'backfill_checkpoints')
+
+def _text(doc):
+    if doc.get('type') == 'post':
+        text = (doc.get('title') or '') + ' ' + (doc.get('body') or '')
+    else:
+        text = doc.get('body') or ''
+    return clean_text(text)
+
+def _format_eta(seconds):
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s"
+
+def run_backfill(collection=None, batch_size=BACKFILL_BATCH_SIZE, restart=False):
+    """Re-analyze documents with stale NLP labels; returns the final checkpoint."""
+    # Fork the NLP workers before the MongoDB client starts its monitor threads
+    pool = start_worker_pool()
+    db = get_db()
+    collection = collection if collection is not None else db[os.getenv('COLLECTION_NAME', 'posts_comments')]
+    checkpoints = db[CHECKPOINT_COLLECTION]
+    version = model_version()
+    checkpoint_id = f"{collection.name}:{version}"
+
+    checkpoint = None if restart else checkpoints.find_one({'_id': checkpoint_id})
+    stale = {'nlp_version': {'$ne': version}}
+    query = dict(stale)
+    if checkpoint and checkpoint.get('last_id') is not None:
+        query['_id'] = {'$gt': checkpoint['last_id']}
+        print(f"⏯️  Resuming backfill after {checkpoint['last_id']} ({checkpoint['processed']} done)")
+
+    remaining = collection.count_documents(query)
+    processed = checkpoint['processed'] if checkpoint else 0
+    print(f"\n{'='*60}")
+    print(f"🔁 NLP BACKFILL -> version {version}")
+    print(f"📊 Documents to re-analyze: {remaining:,}")
+    print(f"{'='*60}")
+
+    run_batch = pool.analyze_batch if pool else analyze_batch
+    cursor = collection.find(
+        query, {'_id': 1, 'type': 1, 'title': 1, 'body': 1}, sort=[('_id', 1)]
+    ).batch_size(batch_size)
+
+    start = last_report = time.time()
+    done_this_run = 0
+    batch = []
+
+    def flush(docs):
+        nonlocal processed, done_this_run
+        texts = [_text(doc) for doc in docs]
+        hashes = [content_hash(text) for text in texts]
+        results = run_batch(texts, batch_size=NLP_FORWARD_BATCH, hashes=hashes)
+        updates = [
+            UpdateOne(
+                {'_id': doc['_id']},
+                {'$set': {**result, 'nlp_version': version, 'content_hash': text_hash}}
+            )
+            for doc, text_hash, result in zip(docs, hashes, results)
+            # Failed documents keep their stale version for the next pass
+            if result is not None
+        ]
+        if updates:
+            collection.bulk_write(updates, ordered=False)
+        processed += len(docs)
+        done_this_run += len(docs)
+        checkpoints.update_one(
+            {'_id': checkpoint_id},
+            {'$set': {
+                'last_id': docs[-1]['_id'],
+                'processed': processed,
+                'version': version,
+                'updated_at': datetime.utcnow(),
+            }},
+            upsert=True
+        )
+
+    try:
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) < batch_size:
+                continue
+            flush(batch)
+            batch = []
+
+            if time.time() - last_report >= BACKFILL_REPORT_EVERY:
+                elapsed = time.time() - start
+                rate = done_this_run / elapsed if elapsed else 0.0
+                left = max(remaining - done_this_run, 0)
+                eta = left / rate if rate else None
+                print(f"⏳ {done_this_run:,}/{remaining:,} | {rate:.1f} docs/s | ETA {_format_eta(eta)}")
+                last_report = time.time()
+        if batch:
+            flush(batch)
+        # Pass complete: the next run rescans from the start, which picks up
+        # documents whose analysis failed along with newly stale ones
+        checkpoints.update_one({'_id': checkpoint_id}, {'$set': {'last_id': None}})
+    finally:
+        cursor.close()
+
+    elapsed = time.time() - start
+    print(f"\n✅ Backfill finished: {done_this_run:,} documents in {elapsed:.1f}s "
+          f"({done_this_run / elapsed if elapsed else 0:.1f} docs/s)")
+    print(f"📊 Still stale: {collection.count_documents(stale):,}")
+    return checkpoints.find_one({'_id': checkpoint_id})
+
+if __name__ == "__main__":
+    import sys
+
+    run_backfill(restart='--restart' in sys.argv)
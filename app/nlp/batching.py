@@ -0,0 +1,205 @@
+import os
+import threading
+import numpy as np
+from app.utils.cleaner import clean_text
+
+# Sort texts by token length before batching so short comments are not
+# padded to the length of the longest post in their batch
+LENGTH_BUCKETING = os.getenv('NLP_LENGTH_BUCKETING', 'true').lower() == 'true'
+# Texts per forward pass. Kept below the micro-batch / server batch sizes so
+# each batch handed to analyze_batch is sorted into several forward passes
+NLP_FORWARD_BATCH = int(os.getenv('NLP_FORWARD_BATCH', '8'))
+
+# How texts longer than the classifier's context are handled:
+# 'summarize' runs the abstractive summarizer first (see summarizer.summarize_text),
+# 'window' splits them into overlapping token windows and pools the window scores
+NLP_LONG_TEXT_MODE = os.getenv('NLP_LONG_TEXT_MODE', 'summarize').lower()
+WINDOW_OVERLAP = int(os.getenv('NLP_WINDOW_OVERLAP', '64'))
+MAX_WINDOWS = int(os.getenv('NLP_MAX_WINDOWS', '8'))
+MAX_CLASSIFIER_TOKENS = 512
+
+# Real vs padded tokens of the length-bucketed batches built in this process
+_padding_counts = {'batches': 0, 'real_tokens': 0, 'padded_tokens': 0}
+_padding_lock = threading.Lock()
+
+def token_lengths(texts, tokenizer=None):
+    """Token count per text, falling back to whitespace words without a tokenizer."""
+    if tokenizer is not None:
+        try:
+            encoded = tokenizer(list(texts), add_special_tokens=False, truncation=False)
+            return [len(ids) for ids in encoded['input_ids']]
+        except Exception as e:
+            print(f"Error computing token lengths: {e}")
+    return [len(text.split()) for text in texts]
+
+def length_buckets(indices, texts, batch_size, tokenizer=None):
+    """
+    Split `indices` (positions in `texts`) into batches of similar token length.
+    Callers write results back by index, so the original order is restored.
+    """
+    indices = list(indices)
+    if not LENGTH_BUCKETING or len(indices) <= 1:
+        return [indices[i:i+batch_size] for i in range(0, len(indices), batch_size)]
+
+    lengths = token_lengths([texts[idx] for idx in indices], tokenizer)
+    ordered = sorted(zip(lengths, indices), key=lambda pair: pair[0])
+    batches = [ordered[i:i+batch_size] for i in range(0, len(ordered), batch_size)]
+    # Each batch is padded to its longest (last) text
+    with _padding_lock:
+        _padding_counts['batches'] += len(batches)
+        _padding_counts['real_tokens'] += sum(lengths)
+        _padding_counts['padded_tokens'] += sum(batch[-1][0] * len(batch) for batch in batches)
+    return [[idx for _, idx in batch] for batch in batches]
+
+def get_padding_counts():
+    """Raw padding counters, for the worker pool to ship deltas to its parent."""
+    with _padding_lock:
+        return dict(_padding_counts)
+
+def add_padding_counts(delta):
+    """Add counters measured in another process (see worker_pool)."""
+    with _padding_lock:
+        for key, value in delta.items():
+            _padding_counts[key] = _padding_counts.get(key, 0) + value
+
+def get_padding_stats():
+    """Padded vs real tokens of the batches length_buckets has built so far."""
+    with _padding_lock:
+        counts = dict(_padding_counts)
+    padded = counts['padded_tokens']
+    return {
+        'bucketing': LENGTH_BUCKETING,
+        'forward_batch': NLP_FORWARD_BATCH,
+        **counts,
+        'padding_ratio': round((padded - counts['real_tokens']) / padded, 3) if padded else 0.0,
+    }
+
+def max_tokens(tokenizer):
+    """Usable context of a classifier, capped for tokenizers reporting a huge sentinel."""
+    return min(getattr(tokenizer, 'model_max_length', MAX_CLASSIFIER_TOKENS) or MAX_CLASSIFIER_TOKENS,
+               MAX_CLASSIFIER_TOKENS)
+
+def split_windows(text, tokenizer, overlap=WINDOW_OVERLAP, max_windows=MAX_WINDOWS):
+    """Split text into overlapping windows that fit the classifier; returns (window, n_tokens) pairs."""
+    ids = tokenizer(text, add_special_tokens=False, truncation=False)['input_ids']
+    budget = max_tokens(tokenizer) - tokenizer.num_special_tokens_to_add()
+    if len(ids) <= budget:
+        return [(text, max(len(ids), 1))]
+
+    step = max(budget - overlap, 1)
+    windows = []
+    for start in range(0, len(ids), step):
+        chunk = ids[start:start+budget]
+        windows.append((tokenizer.decode(chunk, skip_special_tokens=True), len(chunk)))
+        if start + budget >= len(ids) or len(windows) >= max_windows:
+            break
+    return windows
+
+def compact_scores(scores):
+    """
+    Round a score vector to float16 precision. MongoDB still stores each
+    value as a double keyed by its label, so this trims noise digits (and the
+    JSON in the Redis cache), not the size of stored documents.
+    """
+    return {label: round(float(np.float16(score)), 4) for label, score in scores.items()}
+
+def prediction(scores):
+    """{'label', 'score', 'scores'} for a full label -> probability mapping."""
+    scores = compact_scores(scores)
+    label = max(scores, key=scores.get)
+    return {'label': label, 'score': scores[label], 'scores': scores}
+
+def _classify_windowed(classifier, texts, indices, batch_size):
+    """Classify every window of every text in length buckets, then pool per text."""
+    windows, owners, weights = [], [], []
+    for idx in indices:
+        for window, n_tokens in split_windows(texts[idx], classifier.tokenizer):
+            windows.append(window)
+            owners.append(idx)
+            weights.append(n_tokens)
+
+    pooled = {}
+    positions = list(range(len(windows)))
+    for batch in length_buckets(positions, windows, batch_size, classifier.tokenizer):
+        outputs = classifier([windows[pos] for pos in batch], batch_size=len(batch),
+                             top_k=None, truncation=True)
+        for pos, window_scores in zip(batch, outputs):
+            totals = pooled.setdefault(owners[pos], {})
+            for entry in window_scores:
+                totals[entry['label']] = totals.get(entry['label'], 0.0) + entry['score'] * weights[pos]
+
+    # Token-weighted mean of the window probabilities
+    weight_sums = {}
+    for owner, weight in zip(owners, weights):
+        weight_sums[owner] = weight_sums.get(owner, 0) + weight
+    return {
+        idx: prediction({label: total / weight_sums[idx] for label, total in totals.items()})
+        for idx, totals in pooled.items()
+    }
+
+def classify_batch(name, texts, indices, batch_size, prepare=None, answered=None):
+    """
+    Run classifier `name` on texts[idx] for each idx in `indices` and return
+    {idx: {'label', 'score', 'scores'}}. Batches that fail are logged and left out.
+    `answered` holds fast-tier predictions the caller already made (otherwise
+    the cascade runs here); `prepare` (e.g. summarization) is applied only to
+    the texts that still go to the transformer.
+    """
+    from app.nlp.cascade import fast_predict
+    from app.nlp.summarizer import get_model, inference_lock
+
+    # Cheap-first cascade: only low-confidence texts reach the transformer
+    if answered is None:
+        predictions, indices = fast_predict(name, texts, indices)
+    else:
+        predictions = dict(answered)
+        indices = [idx for idx in indices if idx not in answered]
+    if not indices:
+        return predictions
+    if prepare is not None:
+        texts = {idx: prepare(texts[idx]) for idx in indices}
+    classifier = get_model(name)
+
+    # The pipelines and their tokenizers are shared by every thread in the process
+    with inference_lock:
+        if NLP_LONG_TEXT_MODE == 'window':
+            try:
+                predictions.update(_classify_windowed(classifier, texts, indices, batch_size))
+            except Exception as e:
+                print(f"Error in batch {name} detection: {e}")
+            return predictions
+
+        # Batch texts of similar token length together to minimise padding
+        for batch_indices in length_buckets(indices, texts, batch_size, classifier.tokenizer):
+            try:
+                # top_k=None returns the full softmax vector from the single forward pass
+                batch_results = classifier([texts[idx] for idx in batch_indices],
+                                           batch_size=len(batch_indices), top_k=None, truncation=True)
+                for idx, r in zip(batch_indices, batch_results):
+                    predictions[idx] = prediction({entry['label']: entry['score'] for entry in r})
+            except Exception as e:
+                print(f"Error in batch {name} detection: {e}")
+    return predictions
+
+def detect_batch(name, texts, default_result, batch_size=32, summarize=True, answered=None, convert=None):
+    """
+    Batch path shared by the classifier heads: clean, answer from the fast
+    tier, summarize what is left, classify it, and fill in defaults.
+    `convert` maps a prediction to the head's result layout.
+
+    Empty texts get default_result(); texts whose batch failed stay None so
+    callers don't cache or store a placeholder as if it were a label.
+    Callers that already cleaned and summarized pass summarize=False, plus the
+    fast-tier predictions they made as `answered`.
+    """
+    from app.nlp.summarizer import summarize_text
+
+    results = [None if text else default_result() for text in texts]
+    indices = [idx for idx, text in enumerate(texts) if text]
+    if not indices:
+        return results
+    cleaned = {idx: clean_text(texts[idx]) if summarize else texts[idx] for idx in indices}
+    prepare = summarize_text if summarize else None
+    for idx, prediction in classify_batch(name, cleaned, indices, batch_size, prepare, answered).items():
+        results[idx] = convert(prediction) if convert else prediction
+    return results
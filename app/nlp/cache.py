@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from app.nlp.summarizer import model_version
+
+# Inference cache: results keyed by hash(cleaned text) + model version.
+# Texts are cleaned once where items enter (utils.cleaner.clean_text), and the
+# content hash computed from them is reused for both MongoDB and cache keys.
+# Tier 1 is an in-process LRU, tier 2 is Redis shared by all workers.
+NLP_CACHE_ENABLED = os.getenv('NLP_CACHE_ENABLED', 'true').lower() == 'true'
+NLP_CACHE_SIZE = int(os.getenv('NLP_CACHE_SIZE', '10000'))
+NLP_CACHE_REDIS = os.getenv('NLP_CACHE_REDIS', 'true').lower() == 'true'
+NLP_CACHE_TTL = int(os.getenv('NLP_CACHE_TTL', str(7 * 24 * 3600)))
+NLP_CACHE_PREFIX = os.getenv('NLP_CACHE_PREFIX', 'nlp:cache')
+
+def content_hash(text):
+    """Hash of a text as returned by clean_text.
+
+    Case is kept: the models are case-sensitive, so 'GREAT' and 'great' can
+    score differently and must not share a cached result.
+    """
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class InferenceCache:
+    """Two-tier (LRU + Redis) cache of NLP results with hit/miss counters."""
+
+    def __init__(self, max_size=NLP_CACHE_SIZE, redis_client=None, ttl=NLP_CACHE_TTL, version=None):
+        self.max_size = max_size
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.version = version or model_version()
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'lru_hits': 0, 'redis_hits': 0, 'misses': 0, 'redis_errors': 0}
+
+    def key(self, text_hash):
+        return f"{NLP_CACHE_PREFIX}:{self.version}:{text_hash}"
+
+    def _lru_get(self, key):
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+            return value
+
+    def _lru_set(self, key, value):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+    def get_many(self, hashes):
+        """Cached results for texts with these content hashes; None where there is no entry."""
+        keys = [self.key(text_hash) for text_hash in hashes]
+        results = [self._lru_get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        if missing and self.redis_client is not None:
+            try:
+                values = self.redis_client.mget([keys[i] for i in missing])
+                for i, value in zip(missing, values):
+                    if value is not None:
+                        results[i] = json.loads(value)
+                        self._lru_set(keys[i], results[i])
+                        self.stats['redis_hits'] += 1
+            except Exception as e:
+                self.stats['redis_errors'] += 1
+                print(f"❌ Error reading NLP cache from Redis: {e}")
+
+        self.stats['lru_hits'] += len(keys) - len(missing)
+        self.stats['misses'] += sum(1 for result in results if result is None)
+        return results
+
+    def set_many(self, hashes, results):
+        """Store results for texts with these content hashes in both tiers."""
+        keys = [self.key(text_hash) for text_hash in hashes]
+        for key, result in zip(keys, results):
+            self._lru_set(key, result)
+
+        if self.redis_client is not None and keys:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, result in zip(keys, results):
+                    pipe.setex(key, self.ttl, json.dumps(result))
+                pipe.execute()
+            except Exception as e:
+                self.stats['redis_errors'] += 1
+                print(f"❌ Error writing NLP cache to Redis: {e}")
+
+    def add_stats(self, delta):
+        """Add hit/miss counters measured in another process (see worker_pool)."""
+        with self._lock:
+            for key, value in delta.items():
+                self.stats[key] = self.stats.get(key, 0) + value
+
+    def get_stats(self):
+        hits = self.stats['lru_hits'] + self.stats['redis_hits']
+        lookups = hits + self.stats['misses']
+        return {
+            **self.stats,
+            'lru_size': len(self._lru),
+            'redis_enabled': self.redis_client is not None,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+            'version': self.version,
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_inference_cache():
+    """Process-wide inference cache, or None when NLP_CACHE_ENABLED is false."""
+    global _cache
+    if not NLP_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                redis_client = None
+                if NLP_CACHE_REDIS:
+                    try:
+                        from app.db.redis_connector import get_redis_manager
+                        redis_manager = get_redis_manager()
+                        if redis_manager.health_check():
+                            redis_client = redis_manager.redis_client
+                        else:
+                            print("⚠️ Redis not available, NLP cache is in-process only")
+                    except Exception as e:
+                        print(f"⚠️ Redis not available, NLP cache is in-process only: {e}")
+                _cache = InferenceCache(redis_client=redis_client)
+    return _cache
@@ -0,0 +1,244 @@
+"""
+Cheap-first cascade for the classifier heads.
+
+A linear model over hashed word n-grams answers first; the transformer only
+runs on texts where its top probability is below the head's threshold.
+The fast models are distilled from the labels already stored in MongoDB:
+
+    python -m app.nlp.cascade train      # fit and save one model per head
+    python -m app.nlp.cascade stats      # show the stored models
+
+Enable with NLP_CASCADE=true. Heads without a trained model fall through to
+the transformer.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+import numpy as np
+
+NLP_CASCADE = os.getenv('NLP_CASCADE', 'false').lower() == 'true'
+CASCADE_MODEL_DIR = Path(os.getenv('NLP_CASCADE_MODEL_DIR', 'models/cascade'))
+HASH_BUCKETS = 2 ** 18
+# Confidence the fast model needs before its answer is used, per head
+CASCADE_THRESHOLDS = {
+    'emotion': float(os.getenv('NLP_CASCADE_THRESHOLD_EMOTION', '0.90')),
+    'intent': float(os.getenv('NLP_CASCADE_THRESHOLD_INTENT', '0.97')),
+    'sarcasm': float(os.getenv('NLP_CASCADE_THRESHOLD_SARCASM', '0.90')),
+}
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+def hashed_features(text):
+    """Bucket indices of the word unigrams and bigrams of a text."""
+    tokens = _TOKEN.findall((text or '').lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return sorted({
+        int.from_bytes(hashlib.md5(gram.encode('utf-8')).digest()[:4], 'little') % HASH_BUCKETS
+        for gram in grams
+    })
+
+def _softmax(logits):
+    exp = np.exp(logits - logits.max())
+    return exp / exp.sum()
+
+class HashedLinearModel:
+    """Multinomial logistic regression over hashed n-gram features."""
+
+    def __init__(self, labels, weights=None, bias=None):
+        self.labels = list(labels)
+        self.weights = weights if weights is not None else np.zeros((HASH_BUCKETS, len(self.labels)), dtype=np.float32)
+        self.bias = bias if bias is not None else np.zeros(len(self.labels), dtype=np.float32)
+        # Hash of the files the model was loaded from (see load())
+        self.fingerprint = None
+
+    def predict_proba(self, text):
+        features = hashed_features(text)
+        logits = self.bias + (self.weights[features].sum(axis=0) if features else 0)
+        return _softmax(logits)
+
+    def predict(self, text):
+        """{'label', 'score', 'scores'} for the most likely label."""
+        from app.nlp.batching import prediction
+
+        return prediction(dict(zip(self.labels, self.predict_proba(text).tolist())))
+
+    def fit(self, texts, labels, epochs=5, lr=0.5, l2=1e-6):
+        """Plain SGD; the sparse rows make each update touch only a few buckets."""
+        targets = [self.labels.index(label) for label in labels]
+        features = [hashed_features(text) for text in texts]
+        order = np.arange(len(texts))
+        rng = np.random.default_rng(0)
+        for _ in range(epochs):
+            rng.shuffle(order)
+            for i in order:
+                if not features[i]:
+                    continue
+                probs = _softmax(self.bias + self.weights[features[i]].sum(axis=0))
+                grad = probs
+                grad[targets[i]] -= 1.0
+                self.weights[features[i]] -= lr * (grad + l2 * self.weights[features[i]])
+                self.bias -= lr * grad
+        return self
+
+    def save(self, path):
+        path.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path / 'weights.npz', weights=self.weights, bias=self.bias)
+        with open(path / 'labels.json', 'w') as f:
+            json.dump(self.labels, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path / 'labels.json') as f:
+            labels = json.load(f)
+        raw = (path / 'weights.npz').read_bytes()
+        data = np.load(io.BytesIO(raw))
+        model = cls(labels, weights=data['weights'], bias=data['bias'])
+        model.fingerprint = hashlib.sha1(raw + json.dumps(labels).encode('utf-8')).hexdigest()[:12]
+        return model
+
+_fast_models = {}
+_fast_lock = threading.Lock()
+_tier_counts = {}
+
+def get_fast_model(name):
+    """Trained fast model for a head, or None if there is none on disk."""
+    if name not in _fast_models:
+        with _fast_lock:
+            if name not in _fast_models:
+                path = CASCADE_MODEL_DIR / name
+                try:
+                    _fast_models[name] = HashedLinearModel.load(path) if path.exists() else None
+                except Exception as e:
+                    print(f"❌ Error loading cascade model for {name}: {e}")
+                    _fast_models[name] = None
+    return _fast_models[name]
+
+def weights_fingerprint():
+    """
+    {head: hash of the loaded fast model or None} for summarizer.model_version(),
+    so retrained weights change cache keys and nlp_version once they are loaded.
+    """
+    models = {name: get_fast_model(name) for name in CASCADE_THRESHOLDS}
+    return {name: model.fingerprint if model else None for name, model in models.items()}
+
+def fast_predict(name, texts, indices):
+    """
+    Answer what the fast model is confident about. Returns ({idx: prediction},
+    remaining indices that need the transformer). Fast answers are tagged
+    with 'tier': 'fast' so retraining can leave them out.
+    """
+    counts = _tier_counts.setdefault(name, {'fast': 0, 'transformer': 0})
+    model = get_fast_model(name) if NLP_CASCADE else None
+    if model is None:
+        counts['transformer'] += len(indices)
+        return {}, list(indices)
+
+    threshold = CASCADE_THRESHOLDS.get(name, 1.0)
+    answered, remaining = {}, []
+    for idx in indices:
+        prediction = model.predict(texts[idx])
+        if prediction['score'] >= threshold:
+            answered[idx] = {**prediction, 'tier': 'fast'}
+        else:
+            remaining.append(idx)
+    counts['fast'] += len(answered)
+    counts['transformer'] += len(remaining)
+    return answered, remaining
+
+def get_tier_counts():
+    """Raw per-head tier counters, for the worker pool to ship deltas to its parent."""
+    return {name: dict(counts) for name, counts in _tier_counts.items()}
+
+def add_tier_counts(deltas):
+    """Add counters measured in another process (see worker_pool)."""
+    for name, delta in deltas.items():
+        counts = _tier_counts.setdefault(name, {'fast': 0, 'transformer': 0})
+        for tier, value in delta.items():
+            counts[tier] = counts.get(tier, 0) + value
+
+def get_cascade_stats():
+    """Fraction of traffic each tier handled, per head."""
+    heads = {}
+    for name, counts in _tier_counts.items():
+        total = counts['fast'] + counts['transformer']
+        heads[name] = {
+            **counts,
+            'fast_fraction': round(counts['fast'] / total, 3) if total else 0.0,
+            'threshold': CASCADE_THRESHOLDS.get(name),
+            'trained': get_fast_model(name) is not None,
+        }
+    return {'enabled': NLP_CASCADE, 'heads': heads}
+
+def _stored_label(value):
+    """
+    Label from a stored {'label', 'score', 'scores'} result, or None. Older
+    layouts (plain labels, the sarcasm bool) and default results for empty
+    text carry no model output over the current label set and are skipped,
+    as are the fast tier's own answers: only transformer labels are distilled.
+    """
+    if isinstance(value, dict) and value.get('scores') and value.get('tier') != 'fast':
+        return value.get('label')
+    return None
+
+def train_from_mongo(heads=('emotion', 'intent', 'sarcasm'), limit=200000, holdout=0.1):
+    """Distill a fast model per head from labels the transformers already stored."""
+    from app.db.connector import get_db
+    from app.utils.cleaner import clean_text
+
+    collection = get_db()[os.getenv('COLLECTION_NAME', 'posts_comments')]
+    docs = list(collection.find(
+        {'emotion': {'$exists': True}},
+        {'_id': 0, 'title': 1, 'body': 1, **{head: 1 for head in heads}}
+    ).limit(limit))
+    print(f"📚 Training cascade models on {len(docs)} documents")
+
+    report = {}
+    for head in heads:
+        pairs = [
+            (clean_text((doc.get('title') or '') + ' ' + (doc.get('body') or '')), _stored_label(doc.get(head)))
+            for doc in docs
+        ]
+        pairs = [(text, label) for text, label in pairs if text and label is not None]
+        if not pairs:
+            print(f"⚠️ No labelled documents for {head}, skipping")
+            continue
+
+        split = int(len(pairs) * (1 - holdout))
+        train, test = pairs[:split], pairs[split:]
+        start = time.time()
+        model = HashedLinearModel(sorted({label for _, label in pairs}))
+        model.fit([t for t, _ in train], [l for _, l in train])
+        model.save(CASCADE_MODEL_DIR / head)
+
+        # Accuracy and coverage at the configured threshold on the held-out slice
+        threshold = CASCADE_THRESHOLDS[head]
+        predictions = [(model.predict(text), label) for text, label in test]
+        confident = [(p, label) for p, label in predictions if p['score'] >= threshold]
+        report[head] = {
+            'train_size': len(train),
+            'labels': model.labels,
+            'fit_seconds': round(time.time() - start, 1),
+            'holdout_accuracy': round(sum(p['label'] == l for p, l in predictions) / len(test), 3) if test else None,
+            'coverage_at_threshold': round(len(confident) / len(test), 3) if test else None,
+            'accuracy_at_threshold': round(sum(p['label'] == l for p, l in confident) / len(confident), 3) if confident else None,
+        }
+        print(f"✅ {head}: {report[head]}")
+    _fast_models.clear()
+    return report
+
+if __name__ == "__main__":
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    if command == 'train':
+        train_from_mongo()
+    else:
+        for head in CASCADE_THRESHOLDS:
+            model = get_fast_model(head)
+            print(f"🧠 {head}: {'labels ' + str(model.labels) if model else 'not trained'} "
+                  f"(threshold {CASCADE_THRESHOLDS[head]})")
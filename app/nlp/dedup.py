@@ -0,0 +1,100 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# Near-duplicate detection: 64-bit SimHash over word shingles, indexed by
+# DEDUP_BANDS bands so any two fingerprints within DEDUP_MAX_DISTANCE bits
+# share at least one band (pigeonhole) and are found without a full scan
+DEDUP_ENABLED = os.getenv('NLP_DEDUP_ENABLED', 'true').lower() == 'true'
+DEDUP_MAX_DISTANCE = int(os.getenv('NLP_DEDUP_MAX_DISTANCE', '3'))
+DEDUP_MIN_TOKENS = int(os.getenv('NLP_DEDUP_MIN_TOKENS', '8'))
+DEDUP_CAPACITY = int(os.getenv('NLP_DEDUP_CAPACITY', '50000'))
+DEDUP_BANDS = DEDUP_MAX_DISTANCE + 1
+SHINGLE_SIZE = 3
+
+_TOKEN = re.compile(r"\w+")
+
+def simhash(text):
+    """64-bit SimHash of a text, or None if it is too short to fingerprint reliably."""
+    tokens = _TOKEN.findall((text or '').lower())
+    if len(tokens) < DEDUP_MIN_TOKENS:
+        return None
+    shingles = [' '.join(tokens[i:i+SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.md5(shingle.encode('utf-8')).digest()[:8], 'little')
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+class NearDuplicateIndex:
+    """Bounded in-process SimHash index mapping fingerprints to analyzed items."""
+
+    def __init__(self, capacity=DEDUP_CAPACITY, max_distance=DEDUP_MAX_DISTANCE):
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self._entries = OrderedDict()   # fingerprint -> entry
+        self._buckets = {}              # (band, value) -> set of fingerprints
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'matches': 0}
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(band, fingerprint >> (band * self.band_bits) & mask) for band in range(self.bands)]
+
+    def find(self, fingerprint):
+        """Closest stored entry within max_distance bits, or None."""
+        with self._lock:
+            self.stats['lookups'] += 1
+            best, best_distance = None, self.max_distance + 1
+            for key in self._band_keys(fingerprint):
+                for candidate in self._buckets.get(key, ()):
+                    distance = hamming(fingerprint, candidate)
+                    if distance < best_distance:
+                        best, best_distance = self._entries[candidate], distance
+            if best is not None:
+                self.stats['matches'] += 1
+            return best
+
+    def add(self, fingerprint, ref, result=None):
+        """Index an item; `result` may be filled in later on the returned entry."""
+        with self._lock:
+            entry = {'ref': ref, 'result': result}
+            if fingerprint not in self._entries:
+                for key in self._band_keys(fingerprint):
+                    self._buckets.setdefault(key, set()).add(fingerprint)
+            self._entries[fingerprint] = entry
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.capacity:
+                old, _ = self._entries.popitem(last=False)
+                for key in self._band_keys(old):
+                    bucket = self._buckets.get(key)
+                    if bucket is not None:
+                        bucket.discard(old)
+                        if not bucket:
+                            del self._buckets[key]
+            return entry
+
+    def get_stats(self):
+        return {**self.stats, 'size': len(self._entries), 'max_distance': self.max_distance}
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_dedup_index():
+    """Process-wide near-duplicate index, or None when NLP_DEDUP_ENABLED is false."""
+    global _index
+    if not DEDUP_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex()
+    return _index
@@ -0,0 +1,152 @@
+"""
+Quantized ONNX Runtime backend for the text classifiers.
+
+Enable with NLP_BACKEND=onnx. Models are exported from the Hugging Face hub
+to ONNX on first use, dynamically quantized to int8 and cached under
+ONNX_MODEL_DIR. Requires the optional `optimum[onnxruntime]` package.
+
+Usage:
+    python -m app.nlp.onnx_backend export          # export + quantize all classifiers
+    python -m app.nlp.onnx_backend parity          # compare labels/latency with torch
+"""
+import os
+import time
+from pathlib import Path
+
+ONNX_MODEL_DIR = Path(os.getenv('ONNX_MODEL_DIR', 'models/onnx'))
+# Quantization preset matching the CPU instruction set: avx512_vnni, avx512, avx2 or arm64
+ONNX_QUANT_PRESET = os.getenv('ONNX_QUANT_PRESET', 'avx2')
+QUANTIZED_FILE = 'model_quantized.onnx'
+
+# Short Reddit-like texts used by the parity check when none are given
+PARITY_SAMPLES = [
+    "This is the best thing I've read all week, thank you!",
+    "I can't believe they cancelled the show again. So annoying.",
+    "Does anyone know how to fix a leaking kitchen faucet?",
+    "Oh great, another Monday. Just what I needed.",
+    "My dog passed away this morning and the house feels empty.",
+    "WIN A FREE IPHONE NOW!!! Click the link in my profile",
+    "The new telescope images are absolutely breathtaking.",
+    "That's terrifying, I would never go into that cave alone.",
+    "Honestly I don't care either way, both options are fine.",
+    "Wow, what a surprise, the update broke everything again.",
+]
+
+def _require_optimum():
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    except ImportError as e:
+        raise RuntimeError(
+            "ONNX backend requires optimum with onnxruntime: pip install 'optimum[onnxruntime]'"
+        ) from e
+    return ORTModelForSequenceClassification, ORTQuantizer, AutoQuantizationConfig
+
+def model_dir(model_id):
+    """Local directory holding the exported model for a hub id."""
+    return ONNX_MODEL_DIR / model_id.replace('/', '__')
+
+def export_quantized(model_id, force=False):
+    """Export a hub classifier to ONNX and quantize it to int8 (dynamic)."""
+    ORTModel, ORTQuantizer, AutoQuantizationConfig = _require_optimum()
+    from transformers import AutoTokenizer
+
+    target = model_dir(model_id)
+    if (target / QUANTIZED_FILE).exists() and not force:
+        return target
+
+    print(f"📦 Exporting {model_id} to ONNX...")
+    start = time.time()
+    fp32_dir = target / 'fp32'
+    model = ORTModel.from_pretrained(model_id, export=True)
+    model.save_pretrained(fp32_dir)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+
+    preset = getattr(AutoQuantizationConfig, ONNX_QUANT_PRESET)
+    qconfig = preset(is_static=False, per_channel=False)
+    quantizer = ORTQuantizer.from_pretrained(fp32_dir)
+    quantizer.quantize(save_dir=target, quantization_config=qconfig)
+    tokenizer.save_pretrained(target)
+    model.config.save_pretrained(target)
+    print(f"✅ Exported and quantized {model_id} in {time.time() - start:.1f}s -> {target}")
+    return target
+
+def load_onnx_pipeline(spec):
+    """Build a text-classification pipeline backed by the quantized ONNX model."""
+    ORTModel, _, _ = _require_optimum()
+    from transformers import AutoTokenizer, pipeline
+
+    target = export_quantized(spec['model'])
+    model = ORTModel.from_pretrained(target, file_name=QUANTIZED_FILE)
+    tokenizer = AutoTokenizer.from_pretrained(target)
+    return pipeline(spec['task'], model=model, tokenizer=tokenizer, **spec['kwargs'])
+
+def _timed_labels(classifier, texts):
+    start = time.time()
+    results = classifier(texts, batch_size=len(texts))
+    elapsed = time.time() - start
+    return [r['label'] for r in results], elapsed
+
+def check_parity(names=None, texts=None, repeats=3):
+    """
+    Run the torch and ONNX classifiers on the same texts and report label
+    agreement and per-item latency for each head.
+    """
+    from app.nlp.summarizer import MODEL_SPECS, get_model
+
+    names = names or [n for n, s in MODEL_SPECS.items() if s['task'] == 'text-classification']
+    texts = texts or PARITY_SAMPLES
+    report = {}
+
+    for name in names:
+        torch_model = get_model(name, backend='torch')
+        onnx_model = get_model(name, backend='onnx')
+        # Warm up both backends before timing
+        torch_model(texts[:1])
+        onnx_model(texts[:1])
+
+        torch_time = onnx_time = 0.0
+        for _ in range(repeats):
+            torch_labels, elapsed = _timed_labels(torch_model, texts)
+            torch_time += elapsed
+            onnx_labels, elapsed = _timed_labels(onnx_model, texts)
+            onnx_time += elapsed
+
+        agree = sum(1 for a, b in zip(torch_labels, onnx_labels) if a == b)
+        per_item = repeats * len(texts)
+        report[name] = {
+            'samples': len(texts),
+            'label_agreement': round(agree / len(texts), 3),
+            'torch_ms_per_item': round(torch_time / per_item * 1000, 2),
+            'onnx_ms_per_item': round(onnx_time / per_item * 1000, 2),
+            'speedup': round(torch_time / onnx_time, 2) if onnx_time else None,
+            'mismatches': [
+                {'text': t, 'torch': a, 'onnx': b}
+                for t, a, b in zip(texts, torch_labels, onnx_labels) if a != b
+            ],
+        }
+    return report
+
+def print_parity_report(report):
+    print(f"\n{'='*60}")
+    print(f"🧪 ONNX vs TORCH PARITY")
+    print(f"{'='*60}")
+    for name, r in report.items():
+        print(f"🧠 {name}: agreement {r['label_agreement']*100:.1f}% on {r['samples']} texts")
+        print(f"   ⏱️  torch {r['torch_ms_per_item']} ms/item | onnx {r['onnx_ms_per_item']} ms/item | {r['speedup']}x")
+        for m in r['mismatches']:
+            print(f"   ⚠️  {m['torch']} -> {m['onnx']}: {m['text'][:60]}")
+    print(f"{'='*60}\n")
+
+if __name__ == "__main__":
+    import sys
+
+    from app.nlp.summarizer import MODEL_SPECS
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'parity'
+    if command == 'export':
+        for name, spec in MODEL_SPECS.items():
+            if spec['task'] == 'text-classification':
+                export_quantized(spec['model'], force='--force' in sys.argv)
+    else:
+        print_parity_report(check_parity())
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.nlp.analyzer import analyze_batch
+from app.nlp.batching import NLP_FORWARD_BATCH
+from app.utils.cleaner import clean_text
+
+# Dynamic batching: requests arriving within NLP_SERVER_MAX_WAIT_MS of each
+# other are coalesced into one forward pass of up to NLP_SERVER_MAX_BATCH texts
+NLP_SERVER_MAX_BATCH = int(os.getenv('NLP_SERVER_MAX_BATCH', '64'))
+NLP_SERVER_MAX_WAIT_MS = float(os.getenv('NLP_SERVER_MAX_WAIT_MS', '10'))
+NLP_SERVER_QUEUE_SIZE = int(os.getenv('NLP_SERVER_QUEUE_SIZE', '1024'))
+
+def _analyze_raw(texts):
+    """Clean client texts once, then analyze them (runs on the inference thread)."""
+    return analyze_batch([clean_text(text) for text in texts], batch_size=NLP_FORWARD_BATCH)
+
+class InferenceServer:
+    """Queues analyze requests and runs them in coalesced batches off the event loop."""
+
+    def __init__(self, max_batch=NLP_SERVER_MAX_BATCH, max_wait_ms=NLP_SERVER_MAX_WAIT_MS,
+                 queue_size=NLP_SERVER_QUEUE_SIZE):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # A single inference thread: torch parallelizes each batch internally,
+        # and the event loop only ever awaits the result
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='nlp-inference')
+        self._worker = None
+        self.stats = {'requests': 0, 'texts': 0, 'batches': 0, 'inference_seconds': 0.0}
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self.executor.shutdown(wait=False)
+
+    async def analyze(self, texts):
+        """Analyze a list of texts; resolves when their batch has run."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((list(texts), future))
+        self.stats['requests'] += 1
+        self.stats['texts'] += len(texts)
+        return await future
+
+    async def _collect(self):
+        """Wait for one request, then gather more until the batch is full or the window closes."""
+        loop = asyncio.get_running_loop()
+        requests = [await self.queue.get()]
+        count = len(requests[0][0])
+        deadline = loop.time() + self.max_wait
+        while count < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            requests.append(request)
+            count += len(request[0])
+        return requests
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            requests = await self._collect()
+            texts = [text for request_texts, _ in requests for text in request_texts]
+            start = time.time()
+            try:
+                # The coalesced batch is split into length-sorted forward passes
+                results = await loop.run_in_executor(self.executor, _analyze_raw, texts)
+            except Exception as e:
+                print(f"❌ Error in batched inference: {e}")
+                for _, future in requests:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats['batches'] += 1
+            self.stats['inference_seconds'] += time.time() - start
+
+            offset = 0
+            for request_texts, future in requests:
+                if not future.done():
+                    future.set_result(results[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+    def get_stats(self):
+        batches = self.stats['batches']
+        return {
+            **self.stats,
+            'inference_seconds': round(self.stats['inference_seconds'], 3),
+            'avg_batch_texts': round(self.stats['texts'] / batches, 1) if batches else 0.0,
+            'queue_depth': self.queue.qsize(),
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+_server = None
+
+def get_inference_server():
+    """Process-wide inference server; must be called from the event loop."""
+    global _server
+    if _server is None:
+        _server = InferenceServer()
+    return _server
+
+async def shutdown_inference_server():
+    global _server
+    if _server is not None:
+        await _server.stop()
+        _server = None
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import resource
+import threading
+import time
+from transformers import pipeline
+from app.nlp.batching import NLP_LONG_TEXT_MODE
+from app.utils.cleaner import CLEANER_VERSION
+
+# Every model used by app/nlp, keyed by the name the modules ask for.
+# Models are built lazily on first use and shared by all modules in the process.
+MODEL_SPECS = {
+    'summarizer': {
+        'task': 'summarization',
+        'model': 'sshleifer/distilbart-cnn-12-6',
+        'kwargs': {'max_length': 130, 'min_length': 30},
+    },
+    'emotion': {
+        'task': 'text-classification',
+        'model': 'j-hartmann/emotion-english-distilroberta-base',
+        'kwargs': {'return_all_scores': False},
+    },
+    'intent': {
+        'task': 'text-classification',
+        'model': 'mrm8488/bert-tiny-finetuned-sms-spam-detection',
+        'kwargs': {'return_all_scores': False},
+    },
+    'sarcasm': {
+        'task': 'text-classification',
+        'model': 'cardiffnlp/twitter-roberta-base-sentiment-latest',
+        'kwargs': {'return_all_scores': False},
+    },
+}
+
+# Inference backend for the classifiers: 'torch' (eager transformers pipelines)
+# or 'onnx' (int8-quantized ONNX Runtime, see app/nlp/onnx_backend.py).
+# The summarizer always runs on torch.
+NLP_BACKEND = os.getenv('NLP_BACKEND', 'torch').lower()
+
+# Version of the {'label', 'score', 'scores'} result layout
+RESULT_FORMAT = 2
+
+_models = {}
+_model_stats = {}
+_lock = threading.Lock()
+# Held around every forward pass and tokenizer call on the shared pipelines.
+# Fetch jobs, the live stream, the ingestion loop and the inference server
+# run NLP on different threads, and a fast tokenizer used from two threads
+# at once fails with "Already borrowed" when they flip its truncation setting
+inference_lock = threading.RLock()
+
+def _rss_mb():
+    """Peak resident set size of this process in MB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _param_mb(model):
+    """Size of a pipeline's weights in MB."""
+    try:
+        return sum(p.numel() * p.element_size() for p in model.model.parameters()) / (1024 * 1024)
+    except Exception:
+        pass
+    # ONNX Runtime models have no parameters; use the size of the .onnx file
+    try:
+        return os.path.getsize(model.model.model_path) / (1024 * 1024)
+    except Exception:
+        return None
+
+def _backend_for(spec, backend=None):
+    """Backend a model actually runs on; only classifiers can use onnx."""
+    backend = (backend or NLP_BACKEND).lower()
+    if spec['task'] != 'text-classification':
+        return 'torch'
+    return backend
+
+def _model_key(name, backend):
+    return name if backend == 'torch' else f"{name}:{backend}"
+
+def get_model(name, backend=None):
+    """Return the shared pipeline for `name`, loading it on first use."""
+    spec = MODEL_SPECS.get(name)
+    if spec is None:
+        raise ValueError(f"Unknown model: {name}")
+    backend = _backend_for(spec, backend)
+    key = _model_key(name, backend)
+
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have finished loading while we waited
+        model = _models.get(key)
+        if model is not None:
+            return model
+
+        print(f"📦 Loading {name} model ({spec['model']}, {backend})...")
+        rss_before = _rss_mb()
+        start = time.time()
+        if backend == 'onnx':
+            # Lazy import: optimum/onnxruntime are optional dependencies
+            from app.nlp.onnx_backend import load_onnx_pipeline
+            model = load_onnx_pipeline(spec)
+        elif backend == 'torch':
+            model = pipeline(spec['task'], model=spec['model'], **spec['kwargs'])
+        else:
+            raise ValueError(f"Unknown NLP backend: {backend}")
+        load_time = time.time() - start
+        weights_mb = _param_mb(model)
+
+        _model_stats[key] = {
+            'model': spec['model'],
+            'task': spec['task'],
+            'backend': backend,
+            'load_time_s': round(load_time, 2),
+            'weights_mb': round(weights_mb, 1) if weights_mb is not None else None,
+            'rss_delta_mb': round(_rss_mb() - rss_before, 1),
+            'pid': os.getpid(),
+        }
+        _models[key] = model
+        print(f"✅ Loaded {key} in {load_time:.2f}s")
+        return model
+
+def model_version():
+    """Short hash identifying the models and backend that produce NLP labels."""
+    # Lazy import: cascade.py pulls in numpy-only code but keeps this module light
+    from app.nlp.cascade import NLP_CASCADE, CASCADE_THRESHOLDS, weights_fingerprint
+
+    fingerprint = json.dumps({
+        'models': {name: [spec['model'], _backend_for(spec)] for name, spec in MODEL_SPECS.items()},
+        'long_text_mode': NLP_LONG_TEXT_MODE,
+        'cascade': {'thresholds': CASCADE_THRESHOLDS, 'weights': weights_fingerprint()} if NLP_CASCADE else None,
+        # Bump when the shape of stored/cached NLP results changes
+        'result_format': RESULT_FORMAT,
+        'cleaner': CLEANER_VERSION,
+    }, sort_keys=True)
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:12]
+
+def get_model_stats():
+    """Load time and memory footprint of every model loaded so far."""
+    return {
+        'models': dict(_model_stats),
+        'total_weights_mb': round(sum(s['weights_mb'] or 0 for s in _model_stats.values()), 1),
+        'process_rss_mb': round(_rss_mb(), 1),
+    }
+
+def preload_models(names=None):
+    """Eagerly load models, e.g. before forking workers or serving traffic."""
+    for name in names or MODEL_SPECS:
+        get_model(name)
+    return get_model_stats()
+
+def summarize_text(text, max_length=400):
+    """Summarize text if it's too long, otherwise return as is."""
+    if not text or len(text) <= max_length:
+        return text
+    # In window mode the classifiers handle long text themselves
+    if NLP_LONG_TEXT_MODE == 'window':
+        return text
+
+    try:
+        summarizer = get_model('summarizer')
+        with inference_lock:
+            # Split into chunks if very long
+            if len(text) > 1000:
+                chunks = [text[i:i+1000] for i in range(0, len(text), 1000)]
+                summaries = []
+                for chunk in chunks[:3]:  # Limit to first 3 chunks
+                    summary = summarizer(chunk, max_length=130, min_length=30, do_sample=False)
+                    summaries.append(summary[0]['summary_text'])
+                return " ".join(summaries)
+            else:
+                summary = summarizer(text, max_length=130, min_length=30, do_sample=False)
+                return summary[0]['summary_text']
+    except Exception as e:
+        print(f"Error in summarization: {e}")
+        # Fallback to truncation
+        return text[:max_length] + "..."
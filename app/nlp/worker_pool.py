@@ -0,0 +1,173 @@
+"""
+Pre-forked NLP worker pool.
+
+The parent process loads every model once, freezes the heap and forks
+NLP_WORKERS children. The children share the model weights copy-on-write,
+so adding workers adds CPU without adding a full copy of the models.
+Each worker gets its own torch intra-op thread count (NLP_WORKER_THREADS).
+Callers submit() whole micro-batches and collect() them later, so up to
+NLP_WORKER_IN_FLIGHT batches run at once. Workers send back the change in
+their cascade, cache and padding counters with each batch, and collect()
+adds it to the parent's, which is where the stats endpoints read them.
+
+Forking copies whatever locks other threads hold at that moment, so the pool
+is started explicitly with start_worker_pool() at process start, before any
+fetch, refresh or lease thread exists. If other threads are already running
+it falls back to a 'forkserver' context whose workers load their own models.
+"""
+import gc
+import multiprocessing
+import os
+import threading
+import time
+from app.nlp.analyzer import analyze_batch
+from app.nlp.batching import NLP_FORWARD_BATCH, add_padding_counts, get_padding_counts
+from app.nlp.cache import get_inference_cache
+from app.nlp.cascade import add_tier_counts, get_tier_counts
+from app.nlp.summarizer import preload_models
+
+NLP_WORKERS = int(os.getenv('NLP_WORKERS', '0'))
+# Default: split the cores evenly so workers don't oversubscribe the CPU
+NLP_WORKER_THREADS = int(os.getenv('NLP_WORKER_THREADS', '0'))
+# Batches submitted but not yet collected; default: two per worker so none idles
+NLP_WORKER_IN_FLIGHT = int(os.getenv('NLP_WORKER_IN_FLIGHT', '0'))
+
+def _init_worker(threads, load_models=False):
+    import torch
+
+    torch.set_num_threads(threads)
+    # Inter-op threads must be set before any parallel work runs in this process
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    if load_models:
+        # forkserver children start clean and don't inherit the parent's models
+        preload_models()
+
+def _counters():
+    """NLP counters of this process."""
+    cache = get_inference_cache()
+    return {
+        'padding': get_padding_counts(),
+        'cascade': get_tier_counts(),
+        'cache': dict(cache.stats) if cache is not None else {},
+    }
+
+def _delta(before, after):
+    return {
+        key: _delta(before.get(key, {}), value) if isinstance(value, dict) else value - before.get(key, 0)
+        for key, value in after.items()
+    }
+
+def _merge_counters(delta):
+    """Add a worker's counter deltas to this (the parent) process."""
+    add_padding_counts(delta['padding'])
+    add_tier_counts(delta['cascade'])
+    cache = get_inference_cache()
+    if cache is not None and delta['cache']:
+        cache.add_stats(delta['cache'])
+
+def _analyze_chunk(args):
+    texts, batch_size, hashes = args
+    before = _counters()
+    results = analyze_batch(texts, batch_size=batch_size, hashes=hashes)
+    return results, _delta(before, _counters())
+
+class NLPWorkerPool:
+    """Fork-based pool of NLP workers sharing the parent's loaded models."""
+
+    def __init__(self, workers=NLP_WORKERS, threads=NLP_WORKER_THREADS):
+        self.workers = max(workers, 1)
+        self.threads = threads or max((os.cpu_count() or 1) // self.workers, 1)
+        self.max_in_flight = NLP_WORKER_IN_FLIGHT or 2 * self.workers
+        self._pool = None
+        self.stats = {'batches': 0, 'texts': 0, 'seconds': 0.0}
+
+    def start(self):
+        if self._pool is not None:
+            return self
+        if threading.active_count() > 1:
+            print(f"⚠️ {threading.active_count() - 1} other threads running, starting NLP workers "
+                  f"with forkserver (models are loaded per worker, not shared)")
+            context = multiprocessing.get_context('forkserver')
+            self._pool = context.Pool(self.workers, initializer=_init_worker, initargs=(self.threads, True))
+            return self
+
+        import torch
+
+        print(f"🧠 Loading NLP models before forking {self.workers} workers...")
+        stats = preload_models()
+        # Keep the parent from spinning up its own thread pool before fork
+        torch.set_num_threads(1)
+        # Move loaded objects to the permanent generation so the GC in the
+        # children doesn't write to (and un-share) their pages
+        gc.collect()
+        gc.freeze()
+
+        context = multiprocessing.get_context('fork')
+        self._pool = context.Pool(self.workers, initializer=_init_worker, initargs=(self.threads,))
+        print(f"✅ Forked {self.workers} NLP workers x {self.threads} threads "
+              f"(models: {stats['total_weights_mb']} MB shared)")
+        return self
+
+    def submit(self, texts, batch_size=NLP_FORWARD_BATCH, hashes=None):
+        """Start analyzing cleaned `texts` on one worker; pass the returned job to collect()."""
+        return {
+            'result': self._pool.apply_async(_analyze_chunk, ((texts, batch_size, hashes),)),
+            'texts': len(texts),
+            'submitted_at': time.time(),
+        }
+
+    def collect(self, job):
+        """Wait for a submitted job, merge its counters and return its results."""
+        results, delta = job['result'].get()
+        _merge_counters(delta)
+        self.stats['batches'] += 1
+        self.stats['texts'] += job['texts']
+        self.stats['seconds'] += time.time() - job['submitted_at']
+        return results
+
+    def analyze_batch(self, texts, batch_size=NLP_FORWARD_BATCH, hashes=None):
+        """Split cleaned texts across the workers and return results in input order."""
+        if not texts:
+            return []
+        chunk = -(-len(texts) // self.workers)
+        jobs = [
+            self.submit(texts[i:i+chunk], batch_size, hashes[i:i+chunk] if hashes is not None else None)
+            for i in range(0, len(texts), chunk)
+        ]
+        return [result for job in jobs for result in self.collect(job)]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            gc.unfreeze()
+
+_pool = None
+_warned = False
+
+def start_worker_pool():
+    """
+    Start the process-wide pool (no-op when NLP_WORKERS is 0). Call this at
+    process start, before any other thread is spawned.
+    """
+    global _pool
+    if NLP_WORKERS <= 0:
+        return None
+    if _pool is None:
+        _pool = NLPWorkerPool().start()
+    return _pool
+
+def get_worker_pool():
+    """
+    The pool started by start_worker_pool(), or None. Never forks by itself:
+    without a started pool, NLP runs in the calling process.
+    """
+    global _warned
+    if _pool is None and NLP_WORKERS > 0 and not _warned:
+        _warned = True
+        print("⚠️ NLP_WORKERS is set but start_worker_pool() was not called at startup; analyzing in-process")
+    return _pool
@@ -0,0 +1,121 @@
+"""
+Background jobs behind POST /stream/fetch.
+
+A job lists a subreddit's hot posts, then expands their comment trees on
+the shared fetch pool (FETCH_JOB_CONCURRENCY at a time, each thread with its
+own PRAW client, all under the Reddit rate limiter). Items that pass the
+bot/spam filters then go through the micro-batcher for NLP (model calls
+are serialized with the other NLP threads by summarizer.inference_lock), and
+are written with one unordered bulk upsert. The API handler only registers the job and returns its id;
+progress is read back with get_job().
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import as_completed
+from pymongo import UpdateOne
+from app.reddit.fetcher import comment_to_dict, get_fetch_executor, item_text, post_to_dict, thread_client
+from app.reddit.filters import get_filter_engine
+from app.reddit.rate_limit import get_rate_limiter
+from app.utils.cleaner import clean_text
+
+FETCH_JOB_CONCURRENCY = int(os.getenv('FETCH_JOB_CONCURRENCY', '4'))
+# Finished jobs kept for status lookups
+FETCH_JOB_HISTORY = int(os.getenv('FETCH_JOB_HISTORY', '100'))
+
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+def create_job(subreddit, post_limit, comments_per_post):
+    """Register a queued job and return its id."""
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        _jobs[job_id] = {
+            'job_id': job_id,
+            'subreddit': subreddit,
+            'post_limit': post_limit,
+            'comments_per_post': comments_per_post,
+            'status': 'queued',
+            'created_at': time.time(),
+        }
+        while len(_jobs) > FETCH_JOB_HISTORY:
+            _jobs.popitem(last=False)
+    return job_id
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+def _update(job_id, **fields):
+    with _jobs_lock:
+        if job_id in _jobs:
+            _jobs[job_id].update(fields)
+
+def expand_comments(reddit_client, post_id, subreddit, limit, limiter):
+    """First `limit` comments of a submission, loaded on the calling thread's client."""
+    limiter.acquire(1)
+    submission = thread_client(reddit_client).submission(id=post_id)
+    submission.comments.replace_more(limit=0)
+    return [comment_to_dict(comment, subreddit) for comment in submission.comments.list()[:limit]]
+
+def run_fetch_job(job_id, subreddit, reddit_client, collection, post_limit=10, comments_per_post=5,
+                  concurrency=FETCH_JOB_CONCURRENCY):
+    """Fetch, analyze and store one subreddit's hot posts and their top comments."""
+    # Lazy import to avoid loading NLP models at API startup
+    from app.reddit.processor import MicroBatcher
+
+    start = time.time()
+    limiter = get_rate_limiter()
+    _update(job_id, status='running', started_at=start)
+    try:
+        limiter.acquire(1)
+        posts = [post_to_dict(submission, subreddit) for submission in reddit_client.subreddit(subreddit).hot(limit=post_limit)]
+        _update(job_id, posts_processed=len(posts))
+
+        # Comment trees are independent requests; overlap them on the fetch pool
+        comments = []
+        errors = 0
+        executor = get_fetch_executor(concurrency)
+        futures = [
+            executor.submit(expand_comments, reddit_client, post['id'], subreddit, comments_per_post, limiter)
+            for post in posts
+        ]
+        for future in as_completed(futures):
+            try:
+                comments.extend(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"❌ Error expanding comments in r/{subreddit}: {e}")
+        _update(job_id, comments_processed=len(comments), comment_errors=errors)
+
+        # Same bot/spam rules as the polling and live paths
+        items = posts + comments
+        rejected = get_filter_engine().check_batch([(item['author'], item_text(item)) for item in items])
+        items = [item for item, rule in zip(items, rejected) if not rule]
+        _update(job_id, filtered_out=len(rejected) - len(items))
+
+        batcher = MicroBatcher(collection=collection)
+        analyzed = []
+        for item in items:
+            analyzed.extend(batcher.add(item, clean_text(item_text(item))))
+        analyzed.extend(batcher.flush())
+
+        result = collection.bulk_write(
+            [UpdateOne({'id': item['id'], 'type': item['type']}, {'$set': item}, upsert=True) for item in analyzed],
+            ordered=False
+        ) if analyzed else None
+
+        _update(
+            job_id,
+            status='completed',
+            total_processed=len(analyzed),
+            documents_added=result.upserted_count if result else 0,
+            skipped_unchanged=batcher.skipped_unchanged,
+            duration_seconds=round(time.time() - start, 2),
+        )
+    except Exception as e:
+        print(f"❌ Error in fetch job {job_id} for r/{subreddit}: {e}")
+        _update(job_id, status='failed', error=str(e), duration_seconds=round(time.time() - start, 2))
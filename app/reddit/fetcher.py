@@ -1,63 +1,352 @@
 # fetcher.py
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import praw
 from app.db.redis_connector import get_redis_manager
+from app.reddit.filters import get_filter_engine
+from app.reddit.rate_limit import LISTING_PAGE_SIZE, get_rate_limiter, listing_requests
+from app.reddit.watermarks import get_watermark_store, is_newer
 
-def fetch_reddit_data(subreddits, reddit_client, post_limit=10, comment_limit=20, redis_manager=None):
+# Subreddits fetched in parallel; all threads share one Reddit request budget
+FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', '8'))
+# Only ask for items newer than the last one seen per subreddit/listing
+FETCH_WATERMARKS = os.getenv('FETCH_WATERMARKS', 'true').lower() == 'true'
+
+# 'grouped' fetches subreddits through combined r/a+b+c listings (needs watermarks)
+FETCH_MODE = os.getenv('FETCH_MODE', 'subreddit')
+FETCH_GROUP_SIZE = int(os.getenv('FETCH_GROUP_SIZE', '10'))
+FETCH_GROUP_MAX_DEPTH = int(os.getenv('FETCH_GROUP_MAX_DEPTH', '300'))
+
+# Listing paths, as used by subreddit.new() and subreddit.comments()
+LISTING_PATHS = {'posts': 'r/{subreddit}/new/', 'comments': 'r/{subreddit}/comments/'}
+
+# Bot/spam items are dropped before they reach the Redis streams; a sample of
+# them can be kept in the 'rejected' stream to audit the filter rules
+REJECTED_SAMPLE_RATE = float(os.getenv('REDIS_REJECTED_SAMPLE_RATE', '0'))
+REJECTED_STREAM_MAXLEN = int(os.getenv('REDIS_REJECTED_MAXLEN', '10000'))
+
+def item_text(item):
+    """Text that the filters and NLP models see for an item."""
+    if item['type'] == 'post':
+        return (item['title'] or '') + ' ' + (item['body'] or '')
+    return item['body'] or ''
+
+def publish_item(item, stream_type, redis_manager=None, filters=None):
+    """
+    Filter an item and publish it to its Redis stream if it passes. Rejected
+    items are tagged with 'filtered_by' (and sampled into the rejected stream).
+    """
+    filters = filters or get_filter_engine()
+    rule = filters.check(item['author'], item_text(item))
+    if rule:
+        item['filtered_by'] = rule
+        if redis_manager and REJECTED_SAMPLE_RATE > 0 and random.random() < REJECTED_SAMPLE_RATE:
+            redis_manager.add_to_stream('rejected', item, maxlen=REJECTED_STREAM_MAXLEN)
+    elif redis_manager:
+        redis_manager.add_to_stream(stream_type, item)
+    return item
+
+def post_to_dict(submission, subreddit_name):
+    return {
+        'type': 'post',
+        'subreddit': subreddit_name,
+        'id': submission.id,
+        'author': str(submission.author) if submission.author else '[deleted]',
+        'title': submission.title,
+        'body': submission.selftext,
+        'created_utc': submission.created_utc,
+        'url': submission.url,
+        'score': submission.score,
+        'num_comments': submission.num_comments
+    }
+
+def comment_to_dict(comment, subreddit_name):
+    return {
+        'type': 'comment',
+        'subreddit': subreddit_name,
+        'id': comment.id,
+        'author': str(comment.author) if comment.author else '[deleted]',
+        'body': comment.body,
+        'created_utc': comment.created_utc,
+        'score': comment.score,
+        'parent_id': comment.parent_id,
+        'link_id': comment.link_id,
+        'post_id': comment.link_id.split('_', 1)[-1]
+    }
+
+_thread_clients = threading.local()
+_executors = {}
+_executors_lock = threading.Lock()
+
+def get_fetch_executor(concurrency):
+    """Long-lived fetch pool, so threads (and their Reddit clients) survive between cycles."""
+    with _executors_lock:
+        if concurrency not in _executors:
+            _executors[concurrency] = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='reddit-fetch')
+        return _executors[concurrency]
+
+def thread_client(reddit_client):
+    """
+    A praw.Reddit per fetch thread (PRAW instances are not thread-safe), built
+    from the shared client's credentials. Falls back to the shared client.
+    """
+    client = getattr(_thread_clients, 'client', None)
+    if client is None:
+        try:
+            config = reddit_client.config
+            client = praw.Reddit(
+                client_id=config.client_id,
+                client_secret=config.client_secret,
+                user_agent=config.user_agent
+            )
+            client.read_only = True
+        except Exception:
+            client = reddit_client
+        _thread_clients.client = client
+    return client
+
+def fetch_listing(subreddit_name, stream_type, reddit_client, limit, limiter, watermarks=None):
+    """
+    Newest-first items of a subreddit's 'posts' or 'comments' listing, up to `limit`.
+
+    With a watermark, the newest page is filtered down to the items that
+    arrived since the last fetch, which costs a quiet subreddit one request.
+    Only when that whole page is newer than the watermark (more arrived than
+    fit) are pages requested with `before=<newest seen fullname>`, walking
+    forward from the watermark so nothing in between is skipped. Without a
+    watermark (first run) this is a plain listing. A new watermark at the
+    newest item is staged; the caller commits it once the items are stored.
+    """
+    subreddit = reddit_client.subreddit(subreddit_name)
+    listing = subreddit.new if stream_type == 'posts' else subreddit.comments
+    mark = watermarks.get(subreddit_name, stream_type) if watermarks else None
+
+    limiter.acquire(listing_requests(limit))
+    latest = list(listing(limit=limit))
+    limiter.update_from_client(reddit_client)
+    _count_requests(listing_requests(len(latest)))
+    if mark is None:
+        items = latest
+        if watermarks:
+            watermarks.stats['full_listings'] += 1
+    else:
+        items = [item for item in latest if is_newer(item, mark)]
+        watermarks.stats['incremental_listings'] += 1
+        if not items:
+            watermarks.stats['empty_listings'] += 1
+        elif len(latest) >= limit and len(items) == len(latest):
+            # Each `before` page holds the items just newer than the anchor,
+            # newest first; walk forward in time until a short page or the
+            # limit, and leave the newer items for the next cycle
+            path = LISTING_PATHS[stream_type].format(subreddit=subreddit_name)
+            pages = []
+            anchor = mark['fullname']
+            fetched = 0
+            while fetched < limit:
+                page_size = min(LISTING_PAGE_SIZE, limit - fetched)
+                limiter.acquire(1)
+                page = list(reddit_client.get(path, params={'before': anchor, 'limit': page_size, 'raw_json': 1}))
+                limiter.update_from_client(reddit_client)
+                _count_requests(1)
+                if not page:
+                    break
+                pages.append(page)
+                fetched += len(page)
+                anchor = page[0].fullname
+                if len(page) < page_size:
+                    break
+            if pages:
+                items = [item for page in reversed(pages) for item in page]
+            else:
+                # Reddit returns an empty page when the anchor item was
+                # removed; keep the newest page rather than nothing
+                watermarks.stats['fallbacks'] += 1
+
+    if watermarks and items:
+        watermarks.stage(subreddit_name, stream_type, items, mark)
+    return items
+
+def fetch_subreddit(subreddit_name, reddit_client, post_limit=10, comment_limit=20, limiter=None, watermarks=None):
+    """Fetch one subreddit's new posts and comments, drawing on the shared request budget."""
+    limiter = limiter or get_rate_limiter()
+    items = []
+    try:
+        print(f"📊 Processing r/{subreddit_name}...")
+
+        # Fetch new posts
+        for submission in fetch_listing(subreddit_name, 'posts', reddit_client, post_limit, limiter, watermarks):
+            items.append(post_to_dict(submission, subreddit_name))
+
+        # Fetch new comments
+        for comment in fetch_listing(subreddit_name, 'comments', reddit_client, comment_limit, limiter, watermarks):
+            items.append(comment_to_dict(comment, subreddit_name))
+    except Exception as e:
+        print(f"❌ Error processing r/{subreddit_name}: {e}")
+    return items
+
+def group_subreddits(subreddits, limits, max_size=FETCH_GROUP_SIZE, max_depth=FETCH_GROUP_MAX_DEPTH):
+    """
+    Pack subreddits into combined listings. Subreddits with similar page sizes
+    (i.e. similar arrival rates) share a group, and a group's combined posts
+    and comments depth stays within max_depth.
+    """
+    groups = []
+    group, depth = [], [0, 0]
+    for name in sorted(subreddits, key=lambda n: sum(limits[n]), reverse=True):
+        post_limit, comment_limit = limits[name]
+        if group and (len(group) >= max_size or depth[0] + post_limit > max_depth
+                      or depth[1] + comment_limit > max_depth):
+            groups.append(group)
+            group, depth = [], [0, 0]
+        group.append(name)
+        depth[0] += post_limit
+        depth[1] += comment_limit
+    if group:
+        groups.append(group)
+    return groups
+
+def fetch_group(names, reddit_client, limits, limiter, watermarks):
+    """
+    Fetch several watermarked subreddits through one r/a+b+c listing per stream.
+
+    Items are demultiplexed by subreddit.display_name and kept if newer than
+    that subreddit's own watermark; paging stops at the oldest watermark of the
+    group. The listing depth is the sum of the members' page sizes, so it
+    follows the group's combined arrival rate. A subreddit whose watermark was
+    not reached before the depth ran out is fetched on its own, so nothing is
+    skipped.
+    """
+    by_name = {name.lower(): name for name in names}
+    combined = reddit_client.subreddit('+'.join(names))
+    items = []
+
+    for index, stream_type, to_dict in ((0, 'posts', post_to_dict), (1, 'comments', comment_to_dict)):
+        marks = {name: watermarks.get(name, stream_type) for name in names}
+        floor = min(mark['created_utc'] for mark in marks.values())
+        depth = min(sum(limits[name][index] for name in names), FETCH_GROUP_MAX_DEPTH)
+        listing = combined.new if stream_type == 'posts' else combined.comments
+
+        found = {name: [] for name in names}
+        consumed = 0
+        reached_floor = False
+        oldest = None
+        limiter.acquire(listing_requests(depth))
+        for thing in listing(limit=depth):
+            consumed += 1
+            if thing.created_utc < floor:
+                reached_floor = True
+                break
+            oldest = thing.created_utc
+            name = by_name.get(thing.subreddit.display_name.lower())
+            if name and is_newer(thing, marks[name]):
+                found[name].append(thing)
+        limiter.update_from_client(reddit_client)
+        _count_requests(listing_requests(consumed))
+        watermarks.stats['grouped_listings'] += 1
+
+        for name in names:
+            things = found[name]
+            if not reached_floor and consumed >= depth and oldest is not None and oldest >= marks[name]['created_utc']:
+                # The group's depth ran out above this subreddit's watermark
+                things = fetch_listing(name, stream_type, reddit_client, limits[name][index], limiter, watermarks)
+                watermarks.stats['group_fallbacks'] += 1
+            elif things:
+                watermarks.stage(name, stream_type, things, marks[name])
+            items.extend(to_dict(thing, name) for thing in things)
+    return items
+
+_cycle_stats = {}
+_cycle_lock = threading.Lock()
+
+def _count_requests(requests):
+    """Count Reddit requests where they are made; fetch threads share the counter."""
+    with _cycle_lock:
+        _cycle_stats['requests'] = _cycle_stats.get('requests', 0) + requests
+
+def get_fetch_stats():
+    """Reddit requests made by the most recent fetch_reddit_data() cycle, and its per-subreddit baseline."""
+    return dict(_cycle_stats)
+
+def fetch_reddit_data(subreddits, reddit_client, post_limit=10, comment_limit=20, redis_manager=None,
+                      concurrency=FETCH_CONCURRENCY, watermarks=None, limits=None, mode=None, failed=None):
     """
     Fetch posts and comments from subreddits and stream to Redis if redis_manager is provided.
-    Returns generator for backward compatibility.
+    Subreddits are fetched by up to `concurrency` threads sharing one rate-limit budget.
+    `limits` optionally maps a subreddit to its own (post_limit, comment_limit).
+    With FETCH_WATERMARKS only items newer than the previous fetch are requested.
+    The caller must watermarks.commit() the subreddits whose items it stored
+    (otherwise they are fetched again from the old watermarks next time).
+    In 'grouped' mode (FETCH_MODE) subreddits that already have watermarks are
+    fetched through combined r/a+b+c listings. Subreddits of a combined listing
+    that failed have their staged marks dropped and are added to `failed`.
+    Items are filtered before publishing; rejected ones are still yielded, tagged
+    with 'filtered_by'. Returns generator for backward compatibility.
     """
-    # Only use redis_manager if not None
-    if redis_manager is None:
-        raise RuntimeError('Redis manager must be provided to stream data to Redis.')
-    
-    print(f"🔄 Fetching data from {len(subreddits)} subreddits...")
-    
-    for subreddit_name in subreddits:
+    filters = get_filter_engine()
+    limiter = get_rate_limiter()
+    mode = mode or FETCH_MODE
+    if watermarks is None and FETCH_WATERMARKS:
+        watermarks = get_watermark_store(redis_manager)
+    if watermarks is not None:
+        # Marks staged by an earlier cycle that never got committed are stale
+        watermarks.discard(subreddits)
+    print(f"🔄 Fetching data from {len(subreddits)} subreddits ({concurrency} concurrent)...")
+
+    limits = {name: (limits or {}).get(name, (post_limit, comment_limit)) for name in subreddits}
+    # What the per-subreddit path would cost at least: one newest page per stream and subreddit
+    baseline = sum(listing_requests(p) + listing_requests(c) for p, c in limits.values())
+    with _cycle_lock:
+        _cycle_stats.clear()
+        _cycle_stats.update({'mode': mode, 'subreddits': len(subreddits), 'groups': 0,
+                             'requests': 0, 'per_subreddit_requests': baseline})
+
+    def fetch_one(client, subreddit_name):
+        return fetch_subreddit(subreddit_name, client, *limits[subreddit_name], limiter, watermarks)
+
+    def fetch_many(client, names):
         try:
-            subreddit = reddit_client.subreddit(subreddit_name)
-            print(f"📊 Processing r/{subreddit_name}...")
-            
-            # Fetch new posts
-            for submission in subreddit.new(limit=post_limit):
-                post_data = {
-                    'type': 'post',
-                    'subreddit': subreddit_name,
-                    'id': submission.id,
-                    'author': str(submission.author),
-                    'title': submission.title,
-                    'body': submission.selftext,
-                    'created_utc': submission.created_utc,
-                    'url': submission.url,
-                    'score': submission.score,
-                    'num_comments': submission.num_comments
-                }
-                
-                # Stream to Redis
-                redis_manager.add_to_stream('posts', post_data)
-                yield post_data
-            
-            # Fetch new comments
-            for comment in subreddit.comments(limit=comment_limit):
-                comment_data = {
-                    'type': 'comment',
-                    'subreddit': subreddit_name,
-                    'id': comment.id,
-                    'author': str(comment.author),
-                    'body': comment.body,
-                    'created_utc': comment.created_utc,
-                    'score': comment.score,
-                    'parent_id': comment.parent_id,
-                    'link_id': comment.link_id
-                }
-                
-                # Stream to Redis
-                redis_manager.add_to_stream('comments', comment_data)
-                yield comment_data
-                
+            return fetch_group(names, client, limits, limiter, watermarks)
         except Exception as e:
-            print(f"❌ Error processing r/{subreddit_name}: {e}")
-            continue
+            print(f"❌ Error processing r/{'+'.join(names)}: {e}")
+            # Marks staged by the listings that did succeed point past items
+            # that are now never yielded; drop them so nothing is skipped
+            watermarks.discard(names)
+            if failed is not None:
+                failed.update(names)
+            return []
+
+    units = [(fetch_one, name) for name in subreddits]
+    if mode == 'grouped' and watermarks is not None:
+        ready = [name for name in subreddits
+                 if all(watermarks.get(name, stream_type) for stream_type in ('posts', 'comments'))]
+        # First-time subreddits are fetched on their own to set their watermarks
+        units = [(fetch_one, name) for name in subreddits if name not in ready]
+        groups = group_subreddits(ready, limits)
+        units += [(fetch_many, group) for group in groups]
+        _cycle_stats['groups'] = len(groups)
+        print(f"🧺 {len(ready)} subreddits in {len(groups)} combined listings")
+
+    if concurrency <= 1:
+        for fetch, target in units:
+            items = fetch(reddit_client, target)
+            for item in items:
+                # Filter, then stream to Redis
+                yield publish_item(item, item['type'] + 's', redis_manager, filters)
+        return
+
+    # Network waits overlap in the pool; publishing stays on the calling thread
+    executor = get_fetch_executor(concurrency)
+    def run(fetch, target):
+        return fetch(thread_client(reddit_client), target)
+
+    futures = {executor.submit(run, fetch, target): target for fetch, target in units}
+    for future in as_completed(futures):
+        items = future.result()
+        for item in items:
+            # Filter, then stream to Redis
+            yield publish_item(item, item['type'] + 's', redis_manager, filters)
 
 def fetch_from_redis(stream_type='posts', count=10, redis_manager=None):
     """
@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+# Bot/spam rules live in a JSON file and are re-read when it changes,
+# so they can be tuned without restarting the streamer
+FILTER_RULES_PATH = Path(os.getenv('FILTER_RULES_PATH', Path(__file__).with_name('filter_rules.json')))
+FILTER_RELOAD_INTERVAL = float(os.getenv('FILTER_RELOAD_INTERVAL', '30'))
+
+DEFAULT_RULES = {
+    'min_text_length': 5,
+    'bot_patterns': [r'bot$', r'auto', r'moderator', r'helper', r'notifier'],
+    'spam_patterns': [r'http[s]?://', r'free', r'giveaway', r'win', r'prize'],
+    'spam_keywords': [],
+}
+
+def _compile(rules):
+    """
+    One case-insensitive alternation for a rule list, with a named group per
+    rule so a single search tells which rule fired. Returns (regex, names).
+    """
+    if not rules:
+        return None, {}
+    names = {}
+    parts = []
+    for i, (rule, pattern) in enumerate(rules):
+        group = f"r{i}"
+        names[group] = rule
+        parts.append(f"(?P<{group}>{pattern})")
+    return re.compile('|'.join(parts), re.IGNORECASE), names
+
+class FilterEngine:
+    """Compiled bot/spam filter with per-rule hit counters and hot-reloadable rules."""
+
+    def __init__(self, rules_path=FILTER_RULES_PATH, reload_interval=FILTER_RELOAD_INTERVAL):
+        self.rules_path = Path(rules_path) if rules_path else None
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self.hits = {}
+        self.stats = {'checked': 0, 'kept': 0, 'rejected': 0, 'reloads': 0}
+        self._load(DEFAULT_RULES)
+        self.maybe_reload(force=True)
+
+    def _load(self, rules):
+        bot_rules = [(f"bot:{p}", p) for p in rules.get('bot_patterns', [])]
+        # Literal keywords are escaped into the same alternation as the regexes
+        spam_rules = [(f"spam:{p}", p) for p in rules.get('spam_patterns', [])]
+        spam_rules += [(f"keyword:{k}", re.escape(k)) for k in rules.get('spam_keywords', [])]
+        bot_regex, bot_names = _compile(bot_rules)
+        spam_regex, spam_names = _compile(spam_rules)
+        with self._lock:
+            self.min_text_length = int(rules.get('min_text_length', DEFAULT_RULES['min_text_length']))
+            self._bot_regex, self._bot_names = bot_regex, bot_names
+            self._spam_regex, self._spam_names = spam_regex, spam_names
+            self.rules = rules
+
+    def maybe_reload(self, force=False):
+        """Reload rules if the config file changed (checked at most every reload_interval)."""
+        if self.rules_path is None:
+            return False
+        now = time.time()
+        if not force and now - self._checked_at < self.reload_interval:
+            return False
+        self._checked_at = now
+        try:
+            mtime = self.rules_path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            with open(self.rules_path) as f:
+                rules = {**DEFAULT_RULES, **json.load(f)}
+            self._load(rules)
+            self._mtime = mtime
+            self.stats['reloads'] += 1
+            print(f"🔧 Loaded filter rules from {self.rules_path}")
+            return True
+        except Exception as e:
+            # Keep the previous rules rather than letting everything through
+            print(f"❌ Error loading filter rules from {self.rules_path}: {e}")
+            return False
+
+    def _hit(self, rule):
+        self.hits[rule] = self.hits.get(rule, 0) + 1
+        return rule
+
+    def bot_rule(self, author):
+        """Name of the rule that marks `author` as a bot, or None."""
+        if not author:
+            return self._hit('bot:missing_author')
+        regex, names = self._bot_regex, self._bot_names
+        match = regex.search(author) if regex else None
+        return self._hit(names[match.lastgroup]) if match else None
+
+    def spam_rule(self, text):
+        """Name of the rule that marks `text` as spam, or None."""
+        if not text or len(text) < self.min_text_length:
+            return self._hit('spam:too_short')
+        regex, names = self._spam_regex, self._spam_names
+        match = regex.search(text) if regex else None
+        return self._hit(names[match.lastgroup]) if match else None
+
+    def check(self, author, text):
+        """Rule that rejects an item, or None if it should be kept."""
+        self.maybe_reload()
+        self.stats['checked'] += 1
+        rule = self.bot_rule(author) or self.spam_rule(text)
+        self.stats['rejected' if rule else 'kept'] += 1
+        return rule
+
+    def check_batch(self, pairs):
+        """check() over a list of (author, text) pairs; returns the rejecting rule or None for each."""
+        self.maybe_reload()
+        return [self.check(author, text) for author, text in pairs]
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'rules_path': str(self.rules_path) if self.rules_path else None,
+            'hits': dict(sorted(self.hits.items(), key=lambda kv: kv[1], reverse=True)),
+        }
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_filter_engine():
+    """Process-wide filter engine."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = FilterEngine()
+    return _engine
@@ -0,0 +1,219 @@
+"""
+Continuous ingestion from PRAW's subreddit streams.
+
+Producer threads follow `stream.submissions()` and `stream.comments()` of
+combined r/a+b+c subreddits. Each item is filtered and published to Redis
+the moment it shows up, then put on a bounded queue. The consumer runs NLP
+and stores items as soon as a micro-batch fills or times out. Latency drops
+from one poll cycle to a few seconds, and load is spread evenly. A full
+queue blocks the producers, so a slow consumer throttles the streams
+instead of growing memory. With a ShardCoordinator only the subreddits this
+node holds leases for are streamed, and the streams are restarted when that
+set changes.
+"""
+import os
+import queue
+import threading
+import time
+from pymongo import MongoClient
+from app.db.redis_connector import get_redis_manager
+from app.reddit.fetcher import comment_to_dict, item_text, post_to_dict, publish_item, thread_client
+from app.reddit.filters import get_filter_engine
+from app.reddit.processor import MicroBatcher, store_item
+from app.utils.cleaner import clean_text
+
+LIVE_QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', '1000'))
+# Subreddits per combined stream; 0 puts them all in one. Each stream sees at
+# most 100 new items per poll, so very busy subreddits may need smaller groups
+LIVE_GROUP_SIZE = int(os.getenv('LIVE_GROUP_SIZE', '0'))
+# Only emit items that arrive after startup (false also replays the latest ~100)
+LIVE_SKIP_EXISTING = os.getenv('LIVE_SKIP_EXISTING', 'true').lower() == 'true'
+LIVE_REPORT_EVERY = float(os.getenv('LIVE_REPORT_EVERY', '60'))
+LIVE_RETRY_DELAY = float(os.getenv('LIVE_RETRY_DELAY', '10'))
+# How often a sharded node compares its leases with what it is streaming
+LIVE_RESHARD_EVERY = float(os.getenv('LIVE_RESHARD_EVERY', '10'))
+
+class LiveIngestor:
+    """Stream producers feeding a bounded queue, drained by one NLP/storage consumer."""
+
+    def __init__(self, subreddits, reddit_client, collection, redis_manager=None,
+                 queue_size=LIVE_QUEUE_SIZE, group_size=LIVE_GROUP_SIZE, skip_existing=LIVE_SKIP_EXISTING,
+                 shard=None):
+        self.subreddits = list(subreddits)
+        self.shard = shard
+        self.reddit_client = reddit_client
+        self.collection = collection
+        self.redis_manager = redis_manager
+        self.skip_existing = skip_existing
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.filters = get_filter_engine()
+        self.batcher = MicroBatcher(collection=collection)
+        self._names = {name.lower(): name for name in self.subreddits}
+        self._threads = []
+        self._lock = threading.Lock()
+        self.stats = {'posts': 0, 'comments': 0, 'filtered': 0, 'stored': 0, 'stream_errors': 0,
+                      'queue_full_waits': 0, 'latency_sum': 0.0, 'reshards': 0}
+
+        self.group_size = group_size
+        self.groups = []
+        self._streaming = set()
+        # Set to stop the current generation of producer threads
+        self._streams_stop = threading.Event()
+
+    def _produce(self, names, stream_type, stop, skip_existing):
+        """Follow one combined stream until stopped, restarting it after errors."""
+        to_dict = post_to_dict if stream_type == 'posts' else comment_to_dict
+        while not (self.stop_event.is_set() or stop.is_set()):
+            try:
+                client = thread_client(self.reddit_client)
+                stream = client.subreddit('+'.join(names)).stream
+                follow = stream.submissions if stream_type == 'posts' else stream.comments
+                # pause_after=-1 yields None whenever a poll finds nothing new,
+                # which is where we notice a stop request
+                for thing in follow(skip_existing=skip_existing, pause_after=-1):
+                    if self.stop_event.is_set() or stop.is_set():
+                        return
+                    if thing is None:
+                        continue
+                    name = self._names.get(thing.subreddit.display_name.lower(), thing.subreddit.display_name)
+                    self._put(to_dict(thing, name), stop)
+            except Exception as e:
+                with self._lock:
+                    self.stats['stream_errors'] += 1
+                print(f"❌ Error in {stream_type} stream for r/{'+'.join(names)[:60]}: {e}")
+                # Items missed while down are caught up on restart; the upsert
+                # and unchanged-item checks absorb any repeats
+                skip_existing = False
+                stop.wait(LIVE_RETRY_DELAY)
+
+    def _put(self, item, stop):
+        with self._lock:
+            self.stats[item['type'] + 's'] += 1
+        # Filter, then stream to Redis before queueing for NLP
+        publish_item(item, item['type'] + 's', self.redis_manager, self.filters)
+        if item.get('filtered_by'):
+            with self._lock:
+                self.stats['filtered'] += 1
+            return
+        while not (self.stop_event.is_set() or stop.is_set()):
+            try:
+                self.queue.put(item, timeout=1.0)
+                return
+            except queue.Full:
+                with self._lock:
+                    self.stats['queue_full_waits'] += 1
+
+    def _store(self, analyzed):
+        now = time.time()
+        for item in analyzed:
+            store_item(self.collection, item)
+            self.stats['stored'] += 1
+            self.stats['latency_sum'] += max(now - item['created_utc'], 0.0)
+
+    def _assigned(self):
+        """Subreddits this node should stream: all of them, or its leased share."""
+        return set(self.subreddits) if self.shard is None else self.shard.owned()
+
+    def _start_streams(self, names, skip_existing):
+        self._streams_stop = stop = threading.Event()
+        self._streaming = set(names)
+        ordered = [name for name in self.subreddits if name in self._streaming]
+        size = self.group_size or len(ordered) or 1
+        self.groups = [ordered[i:i + size] for i in range(0, len(ordered), size)]
+        for names in self.groups:
+            for stream_type in ('posts', 'comments'):
+                thread = threading.Thread(target=self._produce, args=(names, stream_type, stop, skip_existing),
+                                          name=f"live-{stream_type}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        print(f"📡 Streaming {len(ordered)}/{len(self.subreddits)} subreddits in {len(self.groups)} combined "
+              f"streams ({len(self._threads)} threads, queue {self.queue.maxsize})")
+
+    def _stop_streams(self):
+        self._streams_stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def reshard(self):
+        """Restart the streams if this node's leased subreddits changed; returns True if so."""
+        if self.shard is None:
+            return False
+        owned = self.shard.owned()
+        if owned == self._streaming:
+            return False
+        self.stats['reshards'] += 1
+        self._stop_streams()
+        # Replay the latest items so nothing a newly leased subreddit got
+        # during the hand-over is missed; upserts absorb the repeats
+        self._start_streams(owned, skip_existing=False)
+        return True
+
+    def start(self):
+        self._start_streams(self._assigned(), self.skip_existing)
+
+    def stop(self):
+        self.stop_event.set()
+        self._stop_streams()
+        self._store(self.batcher.flush())
+
+    def run(self):
+        """Consume until interrupted."""
+        self.start()
+        last_report = last_reshard = time.time()
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    item = self.queue.get(timeout=self.batcher.timeout)
+                    self._store(self.batcher.add(item, clean_text(item_text(item))))
+                except queue.Empty:
+                    pass
+                # Submit a timed-out queue and store batches the workers finished
+                self._store(self.batcher.poll())
+
+                if time.time() - last_reshard >= LIVE_RESHARD_EVERY:
+                    self.reshard()
+                    last_reshard = time.time()
+
+                if time.time() - last_report >= LIVE_REPORT_EVERY:
+                    self.report()
+                    last_report = time.time()
+        except KeyboardInterrupt:
+            print("\n⏹️  Stopping live ingestion...")
+        finally:
+            self.stop()
+            self.report()
+
+    def get_stats(self):
+        stored = self.stats['stored']
+        return {
+            **{k: v for k, v in self.stats.items() if k != 'latency_sum'},
+            'queue_depth': self.queue.qsize(),
+            'avg_latency_seconds': round(self.stats['latency_sum'] / stored, 1) if stored else None,
+            'nlp_batches': self.batcher.batches_run,
+        }
+
+    def report(self):
+        stats = self.get_stats()
+        print(f"📡 LIVE {time.strftime('%H:%M:%S')} | posts {stats['posts']} | comments {stats['comments']} | "
+              f"filtered {stats['filtered']} | stored {stats['stored']} | queue {stats['queue_depth']} | "
+              f"avg latency {stats['avg_latency_seconds']}s | stream errors {stats['stream_errors']}")
+
+def run_live(subreddits, reddit_client, mongo_uri, db_name, collection_name, use_redis=True, shard=None):
+    """Ingest `subreddits` (this node's share of them, with a ShardCoordinator) continuously until interrupted."""
+    mongo = MongoClient(mongo_uri)
+    collection = mongo[db_name][collection_name]
+    try:
+        collection.create_index([("id", 1), ("type", 1)])
+    except Exception:
+        pass  # Index might already exist
+
+    redis_manager = None
+    if use_redis:
+        redis_manager = get_redis_manager()
+        if not redis_manager.health_check():
+            print("⚠️ Redis not available, falling back to direct processing")
+            redis_manager = None
+
+    LiveIngestor(subreddits, reddit_client, collection, redis_manager, shard=shard).run()
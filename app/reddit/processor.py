@@ -1,115 +1,365 @@
+import os
 import time
-import re
+from collections import deque
 from pymongo import MongoClient
-from app.reddit.fetcher import fetch_reddit_data, fetch_from_redis, get_redis_stats
+from app.reddit.fetcher import fetch_reddit_data, fetch_from_redis, get_redis_stats, get_fetch_stats, item_text
 from app.nlp import emotion, intent, sarcasm
+from app.nlp.analyzer import analyze_batch
+from app.nlp.batching import NLP_FORWARD_BATCH
+from app.nlp.cache import get_inference_cache, content_hash
+from app.nlp.cascade import get_cascade_stats
+from app.nlp.worker_pool import get_worker_pool
+from app.nlp.summarizer import model_version
+from app.nlp.dedup import get_dedup_index, simhash
 from app.db.redis_connector import get_redis_manager
+from app.utils.cleaner import clean_text
+from app.reddit.filters import get_filter_engine
+from app.reddit.watermarks import get_watermark_store
+from app.reddit.refresh import get_engagement_tracker
 
-# Filtering helpers
-BOT_PATTERNS = [r'bot$', r'auto', r'moderator', r'helper', r'notifier']
-SPAM_PATTERNS = [r'http[s]?://', r'free', r'giveaway', r'win', r'prize']
+# Micro-batching: NLP runs once NLP_BATCH_SIZE items are queued or the oldest
+# queued item has waited NLP_BATCH_TIMEOUT seconds
+NLP_BATCH_SIZE = int(os.getenv('NLP_BATCH_SIZE', '32'))
+NLP_BATCH_TIMEOUT = float(os.getenv('NLP_BATCH_TIMEOUT', '2.0'))
 
+# Filtering helpers (rules are compiled and hot-reloaded by app/reddit/filters.py)
 def is_bot(author: str) -> bool:
-    if not author:
-        return True
-    return any(re.search(pattern, author, re.IGNORECASE) for pattern in BOT_PATTERNS)
+    return get_filter_engine().bot_rule(author) is not None
 
 def is_spam(text: str) -> bool:
-    if not text or len(text) < 5:
-        return True
-    return any(re.search(pattern, text, re.IGNORECASE) for pattern in SPAM_PATTERNS)
+    return get_filter_engine().spam_rule(text) is not None
 
-def analyze_emotion(text: str) -> str:
+def analyze_emotion(text: str) -> dict:
     return emotion.detect_emotion(text)
 
-def analyze_intent(text: str) -> str:
+def analyze_intent(text: str) -> dict:
     return intent.detect_intent(text)
 
-def analyze_sarcasm(text: str) -> bool:
+def analyze_sarcasm(text: str) -> dict:
     return sarcasm.is_sarcastic(text)
 
-def process_and_store(subreddits, reddit_client, mongo_uri, db_name, collection_name, use_redis=True):
+class MicroBatcher:
+    """
+    Queues filtered items and runs NLP on them in batches. With the worker
+    pool, batches are analyzed in the background, up to the pool's
+    max_in_flight at a time, and come back in submission order.
+    """
+
+    def __init__(self, batch_size=NLP_BATCH_SIZE, timeout=NLP_BATCH_TIMEOUT, collection=None):
+        self.batch_size = batch_size
+        self.timeout = timeout
+        # When set, items already stored with the same text skip NLP
+        self.collection = collection
+        self.items = []
+        self.texts = []
+        self.started_at = None
+        self.in_flight = deque()
+        self.batches_run = 0
+        self.skipped_unchanged = 0
+        self.near_duplicates = 0
+        self.nlp_failed = 0
+        # Subreddits with items whose NLP failed; the polling loop holds back
+        # their watermarks so those items are fetched and analyzed again
+        self.failed_subreddits = set()
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item, text):
+        """Queue an item with its clean_text'ed text; returns whatever batches finished (see poll()), else []."""
+        if not self.items:
+            self.started_at = time.time()
+        self.items.append(item)
+        self.texts.append(text)
+        return self.poll()
+
+    def due(self):
+        """True when the oldest queued item has waited past the timeout."""
+        return bool(self.items) and time.time() - self.started_at >= self.timeout
+
+    def poll(self):
+        """Submit the queue if it is full or due, and return the batches that have finished."""
+        if len(self.items) >= self.batch_size or self.due():
+            self.submit()
+        return self.collect(wait=False)
+
+    def flush(self):
+        """Analyze every queued item, wait for all batches in flight and return them."""
+        self.submit()
+        return self.collect(wait=True)
+
+    def submit(self):
+        """Start NLP on the queued items (in the worker pool if there is one)."""
+        if not self.items:
+            return
+        items, texts = self.items, self.texts
+        self.items, self.texts, self.started_at = [], [], None
+
+        for item, text in zip(items, texts):
+            item['content_hash'] = content_hash(text)
+        # Unchanged items are upserted with their fetched fields only (score,
+        # num_comments, ...), which leaves the stored NLP labels in place
+        unchanged = self.find_unchanged(items)
+        pending = [i for i, item in enumerate(items) if (item['type'], item['id']) not in unchanged]
+        self.skipped_unchanged += len(items) - len(pending)
+
+        # Near-duplicates of already analyzed items inherit their labels
+        pending, followers, entries = self.match_near_duplicates(items, texts, pending)
+
+        batch = {'items': items, 'pending': pending, 'followers': followers, 'entries': entries}
+        pending_texts = [texts[i] for i in pending]
+        # The content hashes double as the inference cache keys
+        hashes = [items[i]['content_hash'] for i in pending]
+        # A micro-batch spans several forward passes, so length bucketing can regroup it
+        pool = get_worker_pool()
+        if pool and pending:
+            batch['job'] = pool.submit(pending_texts, batch_size=NLP_FORWARD_BATCH, hashes=hashes)
+        else:
+            batch['results'] = analyze_batch(pending_texts, batch_size=NLP_FORWARD_BATCH,
+                                             hashes=hashes) if pending else []
+        self.in_flight.append(batch)
+
+    def collect(self, wait=False):
+        """
+        Finish batches in submission order: all of them with `wait`, else the
+        ones already done plus any over the pool's max_in_flight.
+        """
+        pool = get_worker_pool()
+        limit = pool.max_in_flight if pool else 0
+        analyzed = []
+        while self.in_flight:
+            job = self.in_flight[0].get('job')
+            if job is not None and not (wait or job['result'].ready() or len(self.in_flight) > limit):
+                break
+            batch = self.in_flight.popleft()
+            results = pool.collect(job) if job is not None else batch['results']
+            analyzed.extend(self.finish(batch, results))
+        return analyzed
+
+    def finish(self, batch, results):
+        """Apply a batch's NLP results to its items and return them."""
+        items = batch['items']
+        version = model_version()
+        for i, result in zip(batch['pending'], results):
+            if i in batch['entries']:
+                batch['entries'][i]['result'] = result
+            if result is None:
+                # NLP failed: store the fetched fields only, without a version
+                # or new content hash, so a refetch (or the backfill, on paths
+                # without watermarks) analyzes it again
+                items[i].pop('content_hash', None)
+                self.nlp_failed += 1
+                self.failed_subreddits.add(items[i]['subreddit'])
+                continue
+            items[i].update(result)
+            items[i]['nlp_version'] = version
+
+        for i, entry in batch['followers'].items():
+            if entry['result'] is None:
+                # Its original failed to analyze; leave it unlabelled like the original
+                items[i].pop('content_hash', None)
+                self.failed_subreddits.add(items[i]['subreddit'])
+                continue
+            items[i].update({head: dict(value) for head, value in entry['result'].items()})
+            items[i]['nlp_version'] = version
+            if entry['ref'] != {'id': items[i]['id'], 'type': items[i]['type']}:
+                items[i]['duplicate_of'] = entry['ref']
+                self.near_duplicates += 1
+        fetched_at = time.time()
+        for item in items:
+            item['fetched_at'] = fetched_at
+        self.batches_run += 1
+        return items
+
+    def match_near_duplicates(self, items, texts, pending):
+        """
+        Split pending indices into those that need NLP and {index: index entry}
+        for near-duplicates of something already (or about to be) analyzed.
+        Also returns {index: entry} for the items this batch adds to the index.
+        """
+        index = get_dedup_index()
+        if index is None:
+            return pending, {}, {}
+
+        # Entries of batches still in flight get their result before this
+        # batch finishes, since batches finish in submission order
+        waiting = {id(entry) for batch in self.in_flight for entry in batch['entries'].values()}
+        to_analyze, followers, entries = [], {}, {}
+        for i in pending:
+            fingerprint = simhash(texts[i])
+            if fingerprint is None:
+                to_analyze.append(i)
+                continue
+            entry = index.find(fingerprint)
+            # Entries left without a result by an earlier failed batch can't be followed
+            if entry is not None and (entry['result'] is not None or id(entry) in waiting):
+                followers[i] = entry
+            else:
+                # Index now so later near-duplicates follow this item
+                ref = {'id': items[i]['id'], 'type': items[i]['type']}
+                entries[i] = index.add(fingerprint, ref)
+                waiting.add(id(entries[i]))
+                to_analyze.append(i)
+        return to_analyze, followers, entries
+
+    def find_unchanged(self, items):
+        """(type, id) of items already stored and analyzed with the same text and models, in one query."""
+        if self.collection is None or not items:
+            return set()
+        try:
+            cursor = self.collection.find(
+                {'id': {'$in': list({item['id'] for item in items})}},
+                {'_id': 0, 'id': 1, 'type': 1, 'content_hash': 1, 'nlp_version': 1}
+            )
+            stored = {(doc.get('type'), doc['id']): doc for doc in cursor}
+        except Exception as e:
+            print(f"❌ Error looking up stored items: {e}")
+            return set()
+
+        # Stale labels (older nlp_version) are re-analyzed even if the text is the same
+        version = model_version()
+        unchanged = set()
+        for item in items:
+            doc = stored.get((item['type'], item['id']))
+            if doc and doc.get('nlp_version') == version and doc.get('content_hash') == item['content_hash']:
+                unchanged.add((item['type'], item['id']))
+        return unchanged
+
+def store_item(collection, item, stats=None):
+    """Upsert an analyzed item into MongoDB and update the counters; returns False on failure."""
+    try:
+        result = collection.update_one(
+            {'id': item['id'], 'type': item['type']},
+            {'$set': item},
+            upsert=True
+        )
+
+        if result.upserted_id:
+            # New item was inserted
+            if item['type'] == 'post':
+                # Its score and comment count keep moving; re-poll them cheaply
+                tracker = get_engagement_tracker()
+                if tracker is not None:
+                    tracker.track(item)
+                if stats is not None:
+                    stats['posts_stored'] += 1
+                print(f"✅ NEW POST: r/{item['subreddit']} - {item['title'][:50]}...")
+            else:
+                if stats is not None:
+                    stats['comments_stored'] += 1
+                print(f"💬 NEW COMMENT: r/{item['subreddit']} - {item['body'][:50]}...")
+        else:
+            # Item was updated (already existed)
+            if item['type'] == 'post':
+                print(f"🔄 UPDATED POST: r/{item['subreddit']} - {item['title'][:50]}...")
+            else:
+                print(f"🔄 UPDATED COMMENT: r/{item['subreddit']} - {item['body'][:50]}...")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error storing {item['type']}: {e}")
+        return False
+
+def connect_collection(mongo_uri, db_name, collection_name):
+    """MongoDB collection with the id lookups used for upserts and unchanged-item checks indexed."""
+    collection = MongoClient(mongo_uri)[db_name][collection_name]
+    try:
+        collection.create_index([("id", 1), ("type", 1)])
+    except Exception:
+        pass  # Index might already exist
+    return collection
+
+def connect_redis(use_redis=True):
+    """Redis manager if enabled and reachable, else None."""
+    if not use_redis:
+        return None
+    redis_manager = get_redis_manager()
+    if not redis_manager.health_check():
+        print("⚠️ Redis not available, falling back to direct processing")
+        return None
+    return redis_manager
+
+def process_and_store(subreddits, reddit_client, mongo_uri, db_name, collection_name, use_redis=True,
+                      limits=None, concurrency=None, collection=None, redis_manager=None):
     """
     Process and store Reddit data with Redis streaming support.
+    `limits` maps a subreddit to its own (post_limit, comment_limit) and
+    `concurrency` overrides FETCH_CONCURRENCY. Long-running callers pass the
+    `collection` and `redis_manager` they opened once instead of reconnecting
+    every call. Returns the created_utc of every fetched item per subreddit
+    and listing, for the polling scheduler.
     """
-    # Initialize connections
-    mongo = MongoClient(mongo_uri)
-    db = mongo[db_name]
-    collection = db[collection_name]
-    
-    redis_manager = None
-    if use_redis:
-        redis_manager = get_redis_manager()
-        if not redis_manager.health_check():
-            print("⚠️ Redis not available, falling back to direct processing")
-            use_redis = False
-    
+    # Initialize connections unless the caller keeps them open
+    if collection is None:
+        collection = connect_collection(mongo_uri, db_name, collection_name)
+    if redis_manager is None:
+        redis_manager = connect_redis(use_redis)
+    use_redis = redis_manager is not None
+
     # Track statistics
     total_processed = 0
     posts_processed = 0
     comments_processed = 0
-    posts_stored = 0
-    comments_stored = 0
+    stats = {'posts_stored': 0, 'comments_stored': 0}
+    batcher = MicroBatcher(collection=collection)
+    filters = get_filter_engine()
+    filtered_out = 0
+    arrivals = {name: {'posts': [], 'comments': []} for name in subreddits}
+    failed_subreddits = set()
     start_time = time.time()
-    
+
     print(f"\n{'='*60}")
     print(f"🔄 Starting Reddit data collection at {time.strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"📊 Processing {len(subreddits)} subreddits...")
     print(f"🚀 Redis streaming: {'✅ Enabled' if use_redis else '❌ Disabled'}")
     print(f"{'='*60}")
-    
+
     # Process data
-    for item in fetch_reddit_data(subreddits, reddit_client, redis_manager=redis_manager):
+    # Combined listings that fail mark their subreddits here, holding back their watermarks
+    fetch_kwargs = {'limits': limits, 'failed': failed_subreddits}
+    if concurrency:
+        fetch_kwargs['concurrency'] = concurrency
+    for item in fetch_reddit_data(subreddits, reddit_client, redis_manager=redis_manager, **fetch_kwargs):
         total_processed += 1
-        
+        arrivals.setdefault(item['subreddit'], {'posts': [], 'comments': []})[item['type'] + 's'].append(item['created_utc'])
+
         if item['type'] == 'post':
             posts_processed += 1
         else:
             comments_processed += 1
-            
-        if item['type'] == 'post':
-            text = (item['title'] or '') + ' ' + (item['body'] or '')
+
+        text = item_text(item)
+
+        # The fetcher already filtered the item before publishing it
+        if item.get('filtered_by'):
+            filtered_out += 1
+            # Still honor the timeout (and pick up finished batches) while the fetcher yields filtered items
+            analyzed = batcher.poll()
         else:
-            text = item['body'] or ''
-            
-        if is_bot(item['author']) or is_spam(text):
-            continue
-            
-        # Process with NLP
-        item['emotion'] = analyze_emotion(text)
-        item['intent'] = analyze_intent(text)
-        item['sarcasm'] = analyze_sarcasm(text)
-        item['fetched_at'] = time.time()
-        
-        # Store in MongoDB
-        try:
-            result = collection.update_one(
-                {'id': item['id'], 'type': item['type']}, 
-                {'$set': item}, 
-                upsert=True
-            )
-            
-            if result.upserted_id:
-                # New item was inserted
-                if item['type'] == 'post':
-                    posts_stored += 1
-                    print(f"✅ NEW POST: r/{item['subreddit']} - {item['title'][:50]}...")
-                else:
-                    comments_stored += 1
-                    print(f"💬 NEW COMMENT: r/{item['subreddit']} - {item['body'][:50]}...")
-            else:
-                # Item was updated (already existed)
-                if item['type'] == 'post':
-                    print(f"🔄 UPDATED POST: r/{item['subreddit']} - {item['title'][:50]}...")
-                else:
-                    print(f"🔄 UPDATED COMMENT: r/{item['subreddit']} - {item['body'][:50]}...")
-                    
-        except Exception as e:
-            print(f"❌ Error storing {item['type']}: {e}")
-    
+            # Queue the cleaned text for NLP; a full or timed-out batch is analyzed here
+            analyzed = batcher.add(item, clean_text(text))
+
+        for analyzed_item in analyzed:
+            if not store_item(collection, analyzed_item, stats):
+                failed_subreddits.add(analyzed_item['subreddit'])
+
+    for analyzed_item in batcher.flush():
+        if not store_item(collection, analyzed_item, stats):
+            failed_subreddits.add(analyzed_item['subreddit'])
+
+    # Watermarks only move past items that made it into MongoDB with their
+    # NLP labels; subreddits with a failed write or failed NLP are fetched
+    # from their old watermarks next cycle
+    failed_subreddits |= batcher.failed_subreddits
+    watermarks = get_watermark_store()
+    watermarks.commit([name for name in subreddits if name not in failed_subreddits])
+    watermarks.discard(failed_subreddits)
+
+    posts_stored = stats['posts_stored']
+    comments_stored = stats['comments_stored']
     end_time = time.time()
     duration = end_time - start_time
-    
+
     # Print summary
     print(f"\n{'='*60}")
     print(f"📈 COLLECTION SUMMARY ({time.strftime('%Y-%m-%d %H:%M:%S')})")
@@ -119,16 +369,47 @@ def process_and_store(subreddits, reddit_client, mongo_uri, db_name, collection_
     print(f"📝 Posts processed: {posts_processed} | stored: {posts_stored}")
     print(f"💬 Comments processed: {comments_processed} | stored: {comments_stored}")
     print(f"🗑️  Filtered out: {total_processed - posts_stored - comments_stored}")
-    print(f"📊 Success rate: {((posts_stored + comments_stored) / total_processed * 100):.1f}%")
-    
+    print(f"🚫 Rejected by filters before Redis: {filtered_out}")
+    print(f"🧠 NLP batches: {batcher.batches_run} (size {batcher.batch_size}, forward {NLP_FORWARD_BATCH}) | unchanged, not re-analyzed: {batcher.skipped_unchanged}")
+    print(f"👯 Near-duplicates labelled from an earlier item: {batcher.near_duplicates}")
+    if batcher.nlp_failed:
+        print(f"⚠️ NLP failed, left for the next cycle: {batcher.nlp_failed}")
+    top_rules = list(filters.get_stats()['hits'].items())[:5]
+    if top_rules:
+        print(f"🚫 Top filter rules: " + ", ".join(f"{rule} ({count})" for rule, count in top_rules))
+    cache = get_inference_cache()
+    if cache:
+        cache_stats = cache.get_stats()
+        print(f"🧠 NLP cache: {cache_stats['hit_rate']*100:.1f}% hit rate "
+              f"(LRU {cache_stats['lru_hits']} | Redis {cache_stats['redis_hits']} | miss {cache_stats['misses']})")
+    cascade_stats = get_cascade_stats()
+    if cascade_stats['enabled']:
+        for head, head_stats in cascade_stats['heads'].items():
+            print(f"⚡ Cascade {head}: {head_stats['fast_fraction']*100:.1f}% fast tier "
+                  f"({head_stats['fast']} fast | {head_stats['transformer']} transformer)")
+    watermark_stats = get_watermark_store().get_stats()
+    if failed_subreddits:
+        print(f"🔖 Watermarks kept back for {len(failed_subreddits)} subreddits with failed writes or NLP")
+    print(f"🔖 Listings: {watermark_stats['incremental_listings']} since watermark "
+          f"({watermark_stats['empty_listings']} with nothing new) | {watermark_stats['full_listings']} full")
+    fetch_stats = get_fetch_stats()
+    if fetch_stats.get('groups'):
+        saved = fetch_stats['per_subreddit_requests'] - fetch_stats['requests']
+        print(f"🧺 Reddit requests: {fetch_stats['requests']} in {fetch_stats['groups']} combined listings "
+              f"vs {fetch_stats['per_subreddit_requests']} per subreddit ({saved} saved)")
+    # Nothing new since the watermarks is a normal, quiet cycle
+    if total_processed:
+        print(f"📊 Success rate: {((posts_stored + comments_stored) / total_processed * 100):.1f}%")
+
     # Redis stats if available
     if use_redis and redis_manager:
         redis_stats = get_redis_stats(redis_manager)
         print(f"\n🔴 REDIS STREAMS:")
         for stream_type, count in redis_stats.items():
             print(f"   📊 {stream_type}: {count} items")
-    
+
     print(f"{'='*60}\n")
+    return arrivals
 
 def process_from_redis(mongo_uri, db_name, collection_name, stream_type='posts', count=10):
     """
@@ -138,33 +419,31 @@ def process_from_redis(mongo_uri, db_name, collection_name, stream_type='posts',
     mongo = MongoClient(mongo_uri)
     db = mongo[db_name]
     collection = db[collection_name]
-    
+
     redis_manager = get_redis_manager()
-    
+
     print(f"🔄 Processing {count} items from Redis stream: {stream_type}")
-    
+
     items = fetch_from_redis(stream_type, count, redis_manager)
-    
-    for item in items:
-        if item['type'] == 'post':
-            text = (item['title'] or '') + ' ' + (item['body'] or '')
-        else:
-            text = item['body'] or ''
-            
-        if is_bot(item['author']) or is_spam(text):
+    batcher = MicroBatcher(collection=collection)
+    analyzed = []
+
+    texts = [item_text(item) for item in items]
+    rejected = get_filter_engine().check_batch([(item['author'], text) for item, text in zip(items, texts)])
+    for item, text, rule in zip(items, texts, rejected):
+        if rule:
             continue
-            
-        # Process with NLP
-        item['emotion'] = analyze_emotion(text)
-        item['intent'] = analyze_intent(text)
-        item['sarcasm'] = analyze_sarcasm(text)
-        item['fetched_at'] = time.time()
-        
+
+        # Process with NLP in batches
+        analyzed.extend(batcher.add(item, clean_text(text)))
+    analyzed.extend(batcher.flush())
+
+    for item in analyzed:
         # Store in MongoDB
         collection.update_one(
-            {'id': item['id'], 'type': item['type']}, 
-            {'$set': item}, 
+            {'id': item['id'], 'type': item['type']},
+            {'$set': item},
             upsert=True
         )
-        
-        print(f"✅ Processed {item['type']} from Redis: {item['subreddit']}")
\ No newline at end of file
+
+        print(f"✅ Processed {item['type']} from Redis: {item['subreddit']}")
@@ -0,0 +1,92 @@
+import math
+import os
+import threading
+import time
+
+# Reddit's OAuth quota is per client id, so every fetch thread (and every
+# praw.Reddit instance using the same credentials) draws from one bucket
+REDDIT_REQUESTS_PER_MINUTE = float(os.getenv('REDDIT_REQUESTS_PER_MINUTE', '100'))
+REDDIT_BURST = int(os.getenv('REDDIT_BURST', '10'))
+# Stop spending once Reddit reports this few requests left in the window
+REDDIT_RESERVE = int(os.getenv('REDDIT_RESERVE', '5'))
+LISTING_PAGE_SIZE = 100
+
+def listing_requests(limit):
+    """API requests PRAW makes for a listing of `limit` items (100 per page)."""
+    return max(1, math.ceil((limit or 1) / LISTING_PAGE_SIZE))
+
+class RateLimiter:
+    """Thread-safe token bucket kept in sync with Reddit's X-Ratelimit headers."""
+
+    def __init__(self, requests_per_minute=REDDIT_REQUESTS_PER_MINUTE, burst=REDDIT_BURST, reserve=REDDIT_RESERVE):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst
+        self.reserve = reserve
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0      # wall-clock time from the reset header
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'waited_seconds': 0.0, 'header_pauses': 0}
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, tokens=1):
+        """
+        Block until `tokens` requests may be made. Requests larger than the
+        burst only wait for a full bucket and leave it in debt, so later
+        callers sleep off the excess.
+        """
+        waited = 0.0
+        needed = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                header_wait = self.blocked_until - time.time()
+                if header_wait <= 0 and self.tokens >= needed:
+                    self.tokens -= tokens
+                    self.stats['requests'] += tokens
+                    self.stats['waited_seconds'] += waited
+                    return waited
+                wait = max(header_wait, (needed - self.tokens) / self.rate)
+            time.sleep(min(wait, 5.0))
+            waited += min(wait, 5.0)
+
+    def update_from_client(self, reddit_client):
+        """Pause the whole bucket if Reddit says the window is nearly used up."""
+        try:
+            limits = reddit_client.auth.limits
+        except Exception:
+            return
+        remaining = limits.get('remaining')
+        reset_timestamp = limits.get('reset_timestamp')
+        if remaining is None or reset_timestamp is None:
+            return
+        with self._lock:
+            if remaining <= self.reserve and reset_timestamp > self.blocked_until:
+                self.blocked_until = reset_timestamp
+                self.tokens = 0.0
+                self.stats['header_pauses'] += 1
+                print(f"⏸️  Reddit quota nearly used ({remaining:.0f} left), pausing until reset")
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'waited_seconds': round(self.stats['waited_seconds'], 1),
+            'requests_per_minute': self.rate * 60,
+            'tokens': round(self.tokens, 2),
+        }
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Process-wide Reddit request budget."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
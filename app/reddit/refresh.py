@@ -0,0 +1,266 @@
+"""
+Engagement refresh for recently stored posts.
+
+Posts are tracked from the moment they are stored. Each one has a learned
+velocity (score + comments per second) and a next-check time chosen so that
+about REFRESH_TARGET_CHANGE points of change have accumulated by then. Each
+round takes the due posts with the largest expected change and re-reads them
+through reddit.info(), 100 fullnames per request. The new counts are
+appended to the post's `engagement` history. Posts that have settled (slow
+for REFRESH_SETTLE_CHECKS checks in a row) or grown too old are dropped.
+A round therefore spends a few requests where a full re-crawl would spend
+one per subreddit and listing page.
+"""
+import heapq
+import os
+import threading
+import time
+from pymongo import UpdateOne
+from app.reddit.rate_limit import LISTING_PAGE_SIZE, get_rate_limiter
+
+REFRESH_ENABLED = os.getenv('REFRESH_ENABLED', 'true').lower() == 'true'
+REFRESH_MIN_INTERVAL = float(os.getenv('REFRESH_MIN_INTERVAL', '120'))
+REFRESH_MAX_INTERVAL = float(os.getenv('REFRESH_MAX_INTERVAL', '3600'))
+REFRESH_TARGET_CHANGE = float(os.getenv('REFRESH_TARGET_CHANGE', '10'))
+REFRESH_MAX_AGE = float(os.getenv('REFRESH_MAX_AGE', str(48 * 3600)))
+# Below this many points per hour a check counts towards settling
+REFRESH_SETTLED_PER_HOUR = float(os.getenv('REFRESH_SETTLED_PER_HOUR', '1'))
+REFRESH_SETTLE_CHECKS = int(os.getenv('REFRESH_SETTLE_CHECKS', '3'))
+# Posts re-read per round (reddit.info takes 100 per request)
+REFRESH_MAX_PER_ROUND = int(os.getenv('REFRESH_MAX_PER_ROUND', '500'))
+REFRESH_MAX_TRACKED = int(os.getenv('REFRESH_MAX_TRACKED', '20000'))
+REFRESH_HISTORY = int(os.getenv('REFRESH_HISTORY', '50'))
+REFRESH_VELOCITY_ALPHA = float(os.getenv('REFRESH_VELOCITY_ALPHA', '0.5'))
+
+def change_interval(velocity):
+    """Seconds until REFRESH_TARGET_CHANGE points are expected at `velocity` points/s."""
+    if velocity <= 0:
+        return REFRESH_MAX_INTERVAL
+    return min(max(REFRESH_TARGET_CHANGE / velocity, REFRESH_MIN_INTERVAL), REFRESH_MAX_INTERVAL)
+
+class EngagementTracker:
+    """Priority queue of posts whose score and comment count are still moving."""
+
+    def __init__(self, max_tracked=REFRESH_MAX_TRACKED, owned=None):
+        self.max_tracked = max_tracked
+        # With sharding, a callable returning the subreddits this node owns;
+        # other nodes refresh the rest
+        self.owned = owned
+        self.posts = {}
+        self._heap = []       # (next_check, fullname); stale entries are skipped on pop
+        self._lock = threading.Lock()
+        self.stats = {'tracked': 0, 'refreshed': 0, 'requests': 0, 'rounds': 0,
+                      'settled': 0, 'expired': 0, 'missing': 0, 'handed_off': 0}
+
+    def track(self, item, now=None):
+        """Start (or keep) tracking a stored post dict."""
+        if item.get('type') != 'post' or not item.get('id'):
+            return
+        now = now if now is not None else time.time()
+        created = item.get('created_utc') or now
+        if now - created > REFRESH_MAX_AGE:
+            return
+        if self.owned is not None and item.get('subreddit') not in self.owned():
+            return
+        fullname = f"t3_{item['id']}"
+        with self._lock:
+            if fullname in self.posts:
+                return
+            if len(self.posts) >= self.max_tracked:
+                return
+            score, comments = item.get('score') or 0, item.get('num_comments') or 0
+            # Average rate since creation is the prior until a second reading exists
+            velocity = (abs(score) + comments) / max(now - created, 60.0)
+            next_check = now + change_interval(velocity)
+            self.posts[fullname] = {
+                'id': item['id'], 'subreddit': item.get('subreddit'), 'created_utc': created, 'score': score, 'num_comments': comments,
+                'checked_at': now, 'velocity': velocity, 'next_check': next_check, 'slow_checks': 0,
+            }
+            heapq.heappush(self._heap, (next_check, fullname))
+            self.stats['tracked'] += 1
+
+    def due(self, now=None, limit=REFRESH_MAX_PER_ROUND):
+        """Due fullnames, largest expected change first."""
+        now = now if now is not None else time.time()
+        owned = self.owned() if self.owned is not None else None
+        with self._lock:
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                next_check, fullname = heapq.heappop(self._heap)
+                post = self.posts.get(fullname)
+                if post is None or post['next_check'] != next_check:
+                    continue
+                if owned is not None and post['subreddit'] not in owned:
+                    # Its subreddit moved to another node, which tracks it now
+                    del self.posts[fullname]
+                    self.stats['handed_off'] += 1
+                    continue
+                due.append(fullname)
+            due.sort(key=lambda f: self.posts[f]['velocity'] * (now - self.posts[f]['checked_at']), reverse=True)
+            # Posts past the round's limit go back in the queue untouched
+            for fullname in due[limit:]:
+                heapq.heappush(self._heap, (self.posts[fullname]['next_check'], fullname))
+            return due[:limit]
+
+    def update(self, fullname, score, num_comments, now):
+        """Record a fresh reading; returns False once the post is dropped."""
+        with self._lock:
+            post = self.posts.get(fullname)
+            if post is None:
+                return False
+            elapsed = max(now - post['checked_at'], 1.0)
+            observed = (abs(score - post['score']) + abs(num_comments - post['num_comments'])) / elapsed
+            post['velocity'] = REFRESH_VELOCITY_ALPHA * observed + (1 - REFRESH_VELOCITY_ALPHA) * post['velocity']
+            post['slow_checks'] = post['slow_checks'] + 1 if observed * 3600 < REFRESH_SETTLED_PER_HOUR else 0
+            post.update(score=score, num_comments=num_comments, checked_at=now)
+
+            if post['slow_checks'] >= REFRESH_SETTLE_CHECKS:
+                del self.posts[fullname]
+                self.stats['settled'] += 1
+                return False
+            if now - post['created_utc'] > REFRESH_MAX_AGE:
+                del self.posts[fullname]
+                self.stats['expired'] += 1
+                return False
+            post['next_check'] = now + change_interval(post['velocity'])
+            heapq.heappush(self._heap, (post['next_check'], fullname))
+            return True
+
+    def reschedule(self, fullnames, next_check):
+        with self._lock:
+            for fullname in fullnames:
+                post = self.posts.get(fullname)
+                if post is not None:
+                    post['next_check'] = next_check
+                    heapq.heappush(self._heap, (next_check, fullname))
+
+    def drop(self, fullname):
+        with self._lock:
+            if self.posts.pop(fullname, None) is not None:
+                self.stats['missing'] += 1
+
+    def refresh(self, reddit_client, collection, limiter=None):
+        """Re-read due posts in bulk and store their new engagement; returns posts refreshed."""
+        fullnames = self.due()
+        if not fullnames:
+            return 0
+        limiter = limiter or get_rate_limiter()
+        now = time.time()
+        updates = []
+        seen = set()
+
+        for i in range(0, len(fullnames), LISTING_PAGE_SIZE):
+            chunk = fullnames[i:i + LISTING_PAGE_SIZE]
+            limiter.acquire(1)
+            try:
+                submissions = list(reddit_client.info(fullnames=chunk))
+            except Exception as e:
+                print(f"❌ Error refreshing {len(chunk)} posts: {e}")
+                # Try this chunk again later rather than dropping it
+                self.reschedule(chunk, now + REFRESH_MIN_INTERVAL)
+                continue
+            finally:
+                limiter.update_from_client(reddit_client)
+            self.stats['requests'] += 1
+
+            for submission in submissions:
+                fullname = submission.fullname
+                seen.add(fullname)
+                self.update(fullname, submission.score, submission.num_comments, now)
+                updates.append(UpdateOne(
+                    {'id': submission.id, 'type': 'post'},
+                    {
+                        '$set': {'score': submission.score, 'num_comments': submission.num_comments,
+                                 'engagement_updated_at': now},
+                        '$push': {'engagement': {
+                            '$each': [{'t': now, 'score': submission.score, 'num_comments': submission.num_comments}],
+                            '$slice': -REFRESH_HISTORY,
+                        }},
+                    }
+                ))
+            # Deleted or removed posts are no longer returned
+            for fullname in chunk:
+                if fullname not in seen:
+                    self.drop(fullname)
+
+        if updates:
+            try:
+                collection.bulk_write(updates, ordered=False)
+            except Exception as e:
+                print(f"❌ Error storing refreshed engagement: {e}")
+        self.stats['refreshed'] += len(updates)
+        self.stats['rounds'] += 1
+        return len(updates)
+
+    def seed(self, collection, subreddits=None, now=None):
+        """Track recent posts already in MongoDB (e.g. after a restart), optionally of `subreddits` only."""
+        now = now if now is not None else time.time()
+        query = {'type': 'post', 'created_utc': {'$gte': now - REFRESH_MAX_AGE}}
+        if subreddits is not None:
+            if not subreddits:
+                return
+            query['subreddit'] = {'$in': list(subreddits)}
+        try:
+            cursor = collection.find(
+                query,
+                {'_id': 0, 'type': 1, 'id': 1, 'subreddit': 1, 'created_utc': 1, 'score': 1, 'num_comments': 1}
+            ).limit(self.max_tracked)
+            for doc in cursor:
+                self.track(doc, now)
+        except Exception as e:
+            print(f"❌ Error seeding engagement tracker: {e}")
+
+    def get_stats(self):
+        return {**self.stats, 'tracking': len(self.posts)}
+
+    def run(self, reddit_client, collection, stop_event=None, poll_every=10.0):
+        """Refresh due posts until stop_event is set."""
+        from app.reddit.fetcher import thread_client
+
+        stop_event = stop_event or threading.Event()
+        # PRAW clients are not thread-safe; this thread gets its own
+        reddit_client = thread_client(reddit_client)
+        seeded = set(self.owned()) if self.owned is not None else None
+        self.seed(collection, seeded)
+        print(f"📈 Engagement refresh tracking {len(self.posts)} recent posts")
+        while not stop_event.is_set():
+            if self.owned is not None:
+                # Pick up recent posts of subreddits this node just took over
+                owned = set(self.owned())
+                self.seed(collection, owned - seeded)
+                seeded = owned
+            refreshed = self.refresh(reddit_client, collection)
+            if refreshed:
+                stats = self.get_stats()
+                print(f"📈 Refreshed {refreshed} posts | tracking {stats['tracking']} | "
+                      f"settled {stats['settled']} | expired {stats['expired']} | requests {stats['requests']}")
+            stop_event.wait(poll_every)
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+def get_engagement_tracker():
+    """Process-wide tracker, or None when REFRESH_ENABLED is false."""
+    global _tracker
+    if not REFRESH_ENABLED:
+        return None
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = EngagementTracker()
+    return _tracker
+
+def start_engagement_refresh(reddit_client, collection, shard=None):
+    """
+    Run the process-wide tracker on a daemon thread; returns the thread (or None).
+    With a ShardCoordinator only posts of the subreddits this node owns are refreshed.
+    """
+    tracker = get_engagement_tracker()
+    if tracker is None:
+        return None
+    if shard is not None:
+        tracker.owned = shard.owned
+    thread = threading.Thread(target=tracker.run, args=(reddit_client, collection),
+                              name='engagement-refresh', daemon=True)
+    thread.start()
+    return thread
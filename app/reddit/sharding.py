@@ -0,0 +1,155 @@
+"""
+Splitting subreddits across several fetcher nodes.
+
+Every node heartbeats into a Redis sorted set. The live members form a
+consistent-hash ring, and each subreddit belongs to the node the ring
+assigns it to. Assignment alone is not enough while nodes join or leave
+(two nodes can briefly disagree about membership), so a node only fetches a
+subreddit while it holds that subreddit's lease: a Redis key set with NX
+and a TTL, renewed by its owner. A node hands over a subreddit by releasing
+its lease, and a node that dies loses its leases when they expire. Since
+watermarks live in Redis too, the new owner continues where the old one
+stopped.
+"""
+import bisect
+import hashlib
+import os
+import socket
+import threading
+import time
+import uuid
+
+SHARD_KEY_PREFIX = os.getenv('SHARD_KEY_PREFIX', 'reddit:shard')
+SHARD_LEASE_TTL = float(os.getenv('SHARD_LEASE_TTL', '30'))
+SHARD_VNODES = int(os.getenv('SHARD_VNODES', '64'))
+
+# Only the holder may renew or release a lease
+_RENEW = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+def _hash(value):
+    return int(hashlib.md5(value.encode('utf-8')).hexdigest()[:16], 16)
+
+class HashRing:
+    """Consistent-hash ring with SHARD_VNODES points per node."""
+
+    def __init__(self, nodes, vnodes=SHARD_VNODES):
+        self.nodes = sorted(nodes)
+        self._points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._keys = [point for point, _ in self._points]
+
+    def owner(self, key):
+        if not self._points:
+            return None
+        index = bisect.bisect(self._keys, _hash(key.lower())) % len(self._points)
+        return self._points[index][1]
+
+def default_node_id():
+    return os.getenv('NODE_ID') or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+class ShardCoordinator:
+    """Membership heartbeat, ring assignment and subreddit leases for one node."""
+
+    def __init__(self, subreddits, redis_client, node_id=None, lease_ttl=SHARD_LEASE_TTL):
+        self.subreddits = list(subreddits)
+        self.redis_client = redis_client
+        self.node_id = node_id or default_node_id()
+        self.lease_ttl = lease_ttl
+        self.members_key = f"{SHARD_KEY_PREFIX}:nodes"
+        self._owned = set()
+        self._valid_until = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.members = []
+        self.stats = {'syncs': 0, 'acquired': 0, 'released': 0, 'lost': 0, 'errors': 0}
+
+    def _lease_key(self, subreddit):
+        return f"{SHARD_KEY_PREFIX}:lease:{subreddit.lower()}"
+
+    def heartbeat(self, now):
+        """Refresh this node's membership and return the live members."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zadd(self.members_key, {self.node_id: now})
+        pipe.zremrangebyscore(self.members_key, '-inf', now - self.lease_ttl)
+        pipe.zrange(self.members_key, 0, -1)
+        return pipe.execute()[-1]
+
+    def sync(self):
+        """Heartbeat, then acquire/renew leases for assigned subreddits and release the rest."""
+        now = time.time()
+        ttl_ms = int(self.lease_ttl * 1000)
+        try:
+            members = self.heartbeat(now)
+            ring = HashRing(members)
+            assigned = {name for name in self.subreddits if ring.owner(name) == self.node_id}
+
+            owned = set()
+            for name in self.subreddits:
+                key = self._lease_key(name)
+                if name in assigned:
+                    if name in self._owned and self.redis_client.eval(_RENEW, 1, key, self.node_id, ttl_ms):
+                        owned.add(name)
+                    elif self.redis_client.set(key, self.node_id, nx=True, px=ttl_ms):
+                        owned.add(name)
+                        self.stats['acquired'] += 1
+                    elif name in self._owned:
+                        # Our lease expired and someone else took it
+                        self.stats['lost'] += 1
+                    # Otherwise the previous owner still holds it; retry next sync
+                elif name in self._owned:
+                    self.redis_client.eval(_RELEASE, 1, key, self.node_id)
+                    self.stats['released'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"❌ Error syncing shard leases for {self.node_id}: {e}")
+            # Leases we cannot renew lapse on their own; stop using them when they do
+            return self.owned()
+
+        with self._lock:
+            changed = owned != self._owned
+            self._owned = owned
+            # Renewed leases are safe to act on for a bit less than their TTL
+            self._valid_until = now + self.lease_ttl * 0.8
+            self.members = members
+        self.stats['syncs'] += 1
+        if changed:
+            print(f"🧩 Node {self.node_id}: {len(owned)}/{len(self.subreddits)} subreddits "
+                  f"across {len(members)} nodes")
+        return set(owned)
+
+    def owned(self):
+        """Subreddits this node currently holds leases for."""
+        with self._lock:
+            if time.time() > self._valid_until:
+                return set()
+            return set(self._owned)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync()
+            self._stop.wait(self.lease_ttl / 3)
+
+    def start(self):
+        """Sync now, then keep leases renewed on a daemon thread."""
+        self.sync()
+        self._thread = threading.Thread(target=self._run, name='shard-leases', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Leave the ring and release every lease so other nodes take over at once."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        try:
+            self.redis_client.zrem(self.members_key, self.node_id)
+            for name in self._owned:
+                self.redis_client.eval(_RELEASE, 1, self._lease_key(name), self.node_id)
+        except Exception as e:
+            print(f"❌ Error releasing shard leases for {self.node_id}: {e}")
+        with self._lock:
+            self._owned = set()
+
+    def get_stats(self):
+        return {**self.stats, 'node_id': self.node_id, 'members': list(self.members), 'owned': len(self._owned)}
@@ -1,8 +1,8 @@
-import time
 import os
 from dotenv import load_dotenv
 import praw
-from app.reddit.processor import process_and_store
+from pymongo import MongoClient
+from app.core.scheduler import run_scheduler
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,6 +14,10 @@ REDDIT_USER_AGENT = os.getenv('REDDIT_USER_AGENT', 'AetherPulseB/0.1 by YourUser
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
 DB_NAME = os.getenv('DB_NAME', 'reddit_stream')
 COLLECTION_NAME = os.getenv('COLLECTION_NAME', 'posts_comments')
+# 'poll' runs the adaptive polling scheduler, 'live' follows PRAW's subreddit streams
+STREAMER_MODE = os.getenv('STREAMER_MODE', 'poll')
+# Split TOP_SUBREDDITS with the other streamer nodes on the same Redis
+FETCH_SHARDING = os.getenv('FETCH_SHARDING', 'false').lower() == 'true'
 
 # Redis Configuration (from environment only)
 REDIS_HOST = os.getenv('REDIS_HOST')
@@ -55,6 +59,7 @@ if __name__ == '__main__':
     print(f"📊 Target subreddits: {len(TOP_SUBREDDITS)}")
     print(f"🔴 Redis: {REDIS_HOST}:{REDIS_PORT}")
     print(f"📦 MongoDB: {MONGO_URI}")
+    print(f"⚙️  Mode: {STREAMER_MODE}")
     print(f"{'='*60}")
     
     # Validate credentials before starting
@@ -63,32 +68,46 @@ if __name__ == '__main__':
     
     print("✅ Credentials validated successfully!")
     
+    # Fork NLP workers (NLP_WORKERS) now, while this is the only thread
+    from app.nlp.worker_pool import start_worker_pool
+    start_worker_pool()
+
     reddit = praw.Reddit(
         client_id=REDDIT_CLIENT_ID,
         client_secret=REDDIT_CLIENT_SECRET,
         user_agent=REDDIT_USER_AGENT
     )
     
-    cycle = 1
-    while True:
-        print(f"\n🔄 CYCLE {cycle} - {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"{'='*60}")
-        
-        # Set use_redis to True now that Redis is ready
-        use_redis = True
-        try:
-            process_and_store(
-                TOP_SUBREDDITS, 
-                reddit, 
-                MONGO_URI, 
-                DB_NAME, 
+    shard = None
+    if FETCH_SHARDING:
+        from app.db.redis_connector import get_redis_manager
+        from app.reddit.sharding import ShardCoordinator
+
+        # Subreddits are leased per node through Redis (app/reddit/sharding.py)
+        shard = ShardCoordinator(TOP_SUBREDDITS, get_redis_manager().redis_client).start()
+
+    # Scores and comment counts of recent posts are re-polled in bulk, only
+    # for this node's subreddits when sharded
+    from app.reddit.refresh import start_engagement_refresh
+    start_engagement_refresh(reddit, MongoClient(MONGO_URI)[DB_NAME][COLLECTION_NAME], shard=shard)
+
+    try:
+        if STREAMER_MODE == 'live':
+            from app.reddit.live import run_live
+
+            # Items are ingested within seconds of being posted (app/reddit/live.py)
+            run_live(TOP_SUBREDDITS, reddit, MONGO_URI, DB_NAME, COLLECTION_NAME, use_redis=True, shard=shard)
+        else:
+            # Each subreddit is polled on its own learned interval (app/core/scheduler.py)
+            run_scheduler(
+                TOP_SUBREDDITS,
+                reddit,
+                MONGO_URI,
+                DB_NAME,
                 COLLECTION_NAME,
-                use_redis=use_redis
+                use_redis=True,
+                shard=shard
             )
-        except Exception as e:
-            print(f"\u274c Error in cycle {cycle}: {e}")
-            print("\ud83d\udd04 Retrying in 5 minutes...")
-        
-        print(f"⏰ Sleeping for 5 minutes... (Next cycle: {cycle + 1})")
-        cycle += 1
-        time.sleep(300)
\ No newline at end of file
+    finally:
+        if shard is not None:
+            shard.stop()
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+
+# Newest item seen per subreddit and listing, so each cycle only asks Reddit
+# for what arrived since the previous one
+WATERMARK_KEY = os.getenv('REDIS_WATERMARK_KEY', 'reddit:watermarks')
+
+def is_newer(thing, mark):
+    """
+    True if `thing` (a PRAW submission/comment) arrived after `mark`. created_utc
+    has one-second resolution, so items from the watermark's own second are
+    told apart by fullname.
+    """
+    if thing.created_utc != mark['created_utc']:
+        return thing.created_utc > mark['created_utc']
+    return thing.fullname not in mark.get('boundary', [mark['fullname']])
+
+class WatermarkStore:
+    """
+    High-water marks kept in a Redis hash, or in memory without Redis.
+    Fetchers stage() new marks; they only take effect once commit() is called
+    after the fetched items have been stored.
+    """
+
+    def __init__(self, redis_client=None, key=WATERMARK_KEY):
+        self.redis_client = redis_client
+        self.key = key
+        self._local = {}
+        self._staged = {}
+        self._lock = threading.Lock()
+        self.stats = {'full_listings': 0, 'incremental_listings': 0, 'empty_listings': 0, 'fallbacks': 0,
+                      'grouped_listings': 0, 'group_fallbacks': 0}
+
+    @staticmethod
+    def _field(subreddit, stream_type):
+        return f"{subreddit.lower()}:{stream_type}"
+
+    def get(self, subreddit, stream_type):
+        """{'fullname', 'created_utc', 'boundary', 'updated_at'} or None."""
+        field = self._field(subreddit, stream_type)
+        if self.redis_client is not None:
+            try:
+                value = self.redis_client.hget(self.key, field)
+                return json.loads(value) if value else None
+            except Exception as e:
+                print(f"❌ Error reading watermark {field}: {e}")
+        with self._lock:
+            return self._local.get(field)
+
+    def set(self, subreddit, stream_type, fullname, created_utc, boundary=None):
+        """`boundary` lists every fullname seen from the watermark's second."""
+        field = self._field(subreddit, stream_type)
+        mark = {'fullname': fullname, 'created_utc': created_utc, 'boundary': boundary or [fullname],
+                'updated_at': time.time()}
+        with self._lock:
+            self._local[field] = mark
+        if self.redis_client is not None:
+            try:
+                self.redis_client.hset(self.key, field, json.dumps(mark))
+            except Exception as e:
+                print(f"❌ Error saving watermark {field}: {e}")
+
+    def stage(self, subreddit, stream_type, things, mark=None):
+        """Remember where the watermark should move once these items are stored."""
+        new_mark = self._next_mark(things, mark)
+        if new_mark:
+            with self._lock:
+                self._staged[(subreddit, stream_type)] = new_mark
+
+    @staticmethod
+    def _next_mark(things, mark):
+        if not things:
+            return None
+        newest = things[0]
+        boundary = [thing.fullname for thing in things if thing.created_utc == newest.created_utc]
+        if mark and mark['created_utc'] == newest.created_utc:
+            boundary += [f for f in mark.get('boundary', [mark['fullname']]) if f not in boundary]
+        return newest.fullname, newest.created_utc, boundary
+
+    def _take_staged(self, subreddits):
+        names = set(subreddits)
+        with self._lock:
+            taken = {key: mark for key, mark in self._staged.items() if key[0] in names}
+            for key in taken:
+                del self._staged[key]
+        return taken
+
+    def commit(self, subreddits):
+        """Apply staged marks of `subreddits`; returns how many moved."""
+        taken = self._take_staged(subreddits)
+        for (subreddit, stream_type), mark in taken.items():
+            self.set(subreddit, stream_type, *mark)
+        return len(taken)
+
+    def discard(self, subreddits):
+        """Drop staged marks, so these subreddits are fetched from the old marks again."""
+        return len(self._take_staged(subreddits))
+
+    def get_stats(self):
+        return {**self.stats, 'redis_enabled': self.redis_client is not None}
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_watermark_store(redis_manager=None):
+    """Process-wide watermarks, on the pipeline's Redis connection once one is provided."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WatermarkStore()
+        if redis_manager is not None and _store.redis_client is None:
+            _store.redis_client = redis_manager.redis_client
+    return _store
@@ -0,0 +1,76 @@
+import html
+import os
+import re
+
+# Bump when the cleaning rules change, since cleaned text feeds the NLP
+# cache keys and content hashes
+CLEANER_VERSION = 2
+WORDS_PER_TOKEN = 1 / 1.3
+
+def _default_max_words():
+    """
+    Rough token budget as whitespace words (~1.3 subword tokens each): one
+    classifier context, or in NLP_LONG_TEXT_MODE=window every window that
+    batching.split_windows may score (same env settings, read here so the
+    cleaner doesn't import the NLP stack).
+    """
+    if os.getenv('NLP_LONG_TEXT_MODE', 'summarize').lower() == 'window':
+        windows = int(os.getenv('NLP_MAX_WINDOWS', '8'))
+        overlap = int(os.getenv('NLP_WINDOW_OVERLAP', '64'))
+        return int((512 + (windows - 1) * (512 - overlap)) * WORDS_PER_TOKEN)
+    return 384
+
+CLEANER_MAX_WORDS = int(os.getenv('CLEANER_MAX_WORDS', str(_default_max_words())))
+
+# All patterns are compiled once at import
+_ZERO_WIDTH = re.compile(r'[\u200b-\u200f\u202a-\u202e\u2060-\u2064\ufeff\u00ad]')
+_CODE_BLOCK = re.compile(r'```.*?```', re.DOTALL)
+_QUOTE_LINE = re.compile(r'^\s*(?:&gt;|>).*$', re.MULTILINE)
+_MD_IMAGE = re.compile(r'!\[([^\]]*)\]\([^)]*\)')
+_MD_LINK = re.compile(r'\[([^\]]+)\]\([^)]*\)')
+_URL = re.compile(r'(?:https?://|www\.)\S+', re.IGNORECASE)
+_USER = re.compile(r'(?<![\w/])/?u/[\w-]+', re.IGNORECASE)
+_SUBREDDIT = re.compile(r'(?<![\w/])/?r/(\w+)', re.IGNORECASE)
+_HEADER = re.compile(r'^\s{0,3}#{1,6}\s*', re.MULTILINE)
+_LIST_MARKER = re.compile(r'^\s*(?:[*+-]|\d+\.)\s+', re.MULTILINE)
+_TABLE_RULE = re.compile(r'^\s*\|?\s*:?-{3,}.*$', re.MULTILINE)
+# Only paired markers hugging non-space text, so '5 * 3', '2^10' and
+# '__init__' survive; underscores are left alone since they are mostly identifiers
+_EMPHASIS = re.compile(r'(?<![\w*])(\*{1,3}|~~)(?=[^\s*])(.+?)(?<=[^\s*])\1(?![\w*])')
+_INLINE_CODE = re.compile(r'`([^`\n]+)`')
+_SUPERSCRIPT = re.compile(r'(?<!\S)\^(?:\(([^)\n]*)\)|(?=\w))')
+_SPOILER = re.compile(r'>!(.*?)!<', re.DOTALL)
+_REPEATED_PUNCT = re.compile(r'([!?.])\1{2,}')
+_WHITESPACE = re.compile(r'\s+')
+
+def clean_text(text, max_words=CLEANER_MAX_WORDS):
+    """
+    Normalize Reddit text for the NLP models: strip markdown and zero-width
+    characters, drop quoted replies and code blocks, collapse URLs and user
+    mentions to placeholders and cap the result at `max_words` words.
+    """
+    if not text:
+        return ''
+    text = html.unescape(text)
+    text = _ZERO_WIDTH.sub('', text)
+    text = _CODE_BLOCK.sub(' ', text)
+    text = _SPOILER.sub(r'\1', text)
+    text = _QUOTE_LINE.sub(' ', text)
+    text = _MD_IMAGE.sub(r'\1', text)
+    text = _MD_LINK.sub(r'\1', text)
+    # 'http' and '@user' are the placeholders the twitter-roberta models were trained with
+    text = _URL.sub(' http ', text)
+    text = _USER.sub(' @user ', text)
+    text = _SUBREDDIT.sub(r'r/\1', text)
+    text = _TABLE_RULE.sub(' ', text)
+    text = _HEADER.sub('', text)
+    text = _LIST_MARKER.sub('', text)
+    text = _EMPHASIS.sub(r'\2', text)
+    text = _INLINE_CODE.sub(r'\1', text)
+    text = _SUPERSCRIPT.sub(lambda m: m.group(1) or '', text)
+    text = _REPEATED_PUNCT.sub(r'\1\1\1', text)
+
+    words = text.split()
+    if max_words and len(words) > max_words:
+        words = words[:max_words]
+    return _WHITESPACE.sub(' ', ' '.join(words)).strip()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Length bucketing tests: batches are sorted by length and cover every index
+exactly once, so writing results back by index restores the input order.
+"""
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from app.nlp import batching
+from app.nlp.batching import length_buckets
+
+TEXTS = ['one two three four five', 'one', 'one two three', 'one two', 'one two three four', 'a b c d e f g']
+
+def test_buckets_sorted_and_round_trip(monkeypatch):
+    monkeypatch.setattr(batching, 'LENGTH_BUCKETING', True)
+    buckets = length_buckets(range(len(TEXTS)), TEXTS, batch_size=2)
+    assert all(len(bucket) <= 2 for bucket in buckets)
+    flat = [idx for bucket in buckets for idx in bucket]
+    assert sorted(flat) == list(range(len(TEXTS)))
+    lengths = [len(TEXTS[idx].split()) for idx in flat]
+    assert lengths == sorted(lengths)
+
+    results = [None] * len(TEXTS)
+    for bucket in buckets:
+        for idx in bucket:
+            results[idx] = TEXTS[idx].upper()
+    assert results == [text.upper() for text in TEXTS]
+
+def test_subset_of_indices(monkeypatch):
+    monkeypatch.setattr(batching, 'LENGTH_BUCKETING', True)
+    buckets = length_buckets([0, 2, 5], TEXTS, batch_size=8)
+    assert buckets == [[2, 0, 5]]
+
+def test_bucketing_disabled_keeps_order(monkeypatch):
+    monkeypatch.setattr(batching, 'LENGTH_BUCKETING', False)
+    assert length_buckets(range(5), TEXTS, batch_size=2) == [[0, 1], [2, 3], [4]]
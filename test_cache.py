@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Inference cache tests: the in-process tier evicts least recently used
+entries, and content hashes keep case since the models are case-sensitive.
+"""
+
+import pytest
+
+pytest.importorskip('transformers')
+
+from app.nlp.cache import InferenceCache, content_hash
+
+def test_lru_evicts_least_recently_used():
+    cache = InferenceCache(max_size=2, version='test')
+    cache.set_many(['a', 'b'], [{'v': 1}, {'v': 2}])
+    # Touch 'a' so 'b' is the oldest
+    assert cache.get_many(['a']) == [{'v': 1}]
+    cache.set_many(['c'], [{'v': 3}])
+    assert cache.get_many(['a', 'b', 'c']) == [{'v': 1}, None, {'v': 3}]
+    assert cache.get_stats()['lru_size'] == 2
+    assert cache.stats['misses'] == 1
+
+def test_versions_do_not_share_entries():
+    assert InferenceCache(version='v1').key('h') != InferenceCache(version='v2').key('h')
+
+def test_content_hash_keeps_case():
+    assert content_hash('GREAT news') != content_hash('great news')
+    assert content_hash('great news') == content_hash('great news')
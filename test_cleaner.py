@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Cleaner tests: only paired markdown markers are stripped, so arithmetic,
+exponents and identifiers reach the models unchanged.
+"""
+
+import pytest
+
+from app.utils.cleaner import clean_text
+
+@pytest.mark.parametrize('text', ['5 * 3 * 2', '2^10', '__init__ is called', 'snake_case_name', 'a*b*c'])
+def test_lone_markers_survive(text):
+    assert clean_text(text) == text
+
+def test_paired_markers_are_stripped():
+    assert clean_text('**bold** and *it* ~~gone~~') == 'bold and it gone'
+    assert clean_text('***both*** and `code()`') == 'both and code()'
+    assert clean_text('^(tiny) and ^hi') == 'tiny and hi'
+
+def test_case_is_kept():
+    assert clean_text('GREAT news') != clean_text('great news')
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate tests: SimHash ignores case and punctuation, short texts are
+not fingerprinted, and the index matches fingerprints within max_distance bits.
+"""
+
+from app.nlp.dedup import DEDUP_MIN_TOKENS, NearDuplicateIndex, hamming, simhash
+
+TEXT = ('the quick brown fox jumps over the lazy dog while the farmer '
+        'watches from the porch and drinks his morning coffee')
+
+def test_simhash_ignores_case_and_punctuation():
+    assert simhash(TEXT) == simhash(TEXT.upper() + '!!!')
+    assert hamming(simhash(TEXT), simhash('moderators remove karma farming bots that repost memes all day long')) > 3
+
+def test_short_text_has_no_fingerprint():
+    assert simhash(' '.join(['word'] * (DEDUP_MIN_TOKENS - 1))) is None
+
+def test_index_threshold():
+    index = NearDuplicateIndex(capacity=10, max_distance=3)
+    fingerprint = simhash(TEXT)
+    index.add(fingerprint, 'original')
+    # Flip bits in different bands and in the same band
+    assert index.find(fingerprint ^ (1 << 0 | 1 << 20 | 1 << 40))['ref'] == 'original'
+    assert index.find(fingerprint ^ 0b111)['ref'] == 'original'
+    assert index.find(fingerprint ^ 0b1111) is None
+    assert index.stats == {'lookups': 3, 'matches': 2}
+
+def test_index_evicts_oldest():
+    index = NearDuplicateIndex(capacity=2, max_distance=0)
+    for i, fingerprint in enumerate([1, 2, 4]):
+        index.add(fingerprint << 60, i)
+    assert index.find(1 << 60) is None
+    assert index.find(4 << 60)['ref'] == 2
+    assert index.get_stats()['size'] == 2
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Filter tests: rule lists compile into one alternation per kind, the rule
+that fired is reported and counted, and rules reload from the JSON file.
+"""
+
+import json
+
+from app.reddit.filters import FilterEngine
+
+def engine(**rules):
+    engine = FilterEngine(rules_path=None)
+    if rules:
+        engine._load(rules)
+    return engine
+
+def test_default_rules_match():
+    filters = engine()
+    assert filters.check('AutoModerator', 'a perfectly normal comment') == 'bot:auto'
+    assert filters.check('someone', 'click https://example.com') == 'spam:http[s]?://'
+    assert filters.check('someone', 'ok') == 'spam:too_short'
+    assert filters.check(None, 'a perfectly normal comment') == 'bot:missing_author'
+    assert filters.check('someone', 'a perfectly normal comment') is None
+    assert filters.stats == {'checked': 5, 'kept': 1, 'rejected': 4, 'reloads': 0}
+    assert filters.hits['bot:auto'] == 1
+
+def test_matching_is_case_insensitive():
+    assert engine().spam_rule('FREE stuff for everyone') == 'spam:free'
+
+def test_keywords_are_literal():
+    filters = engine(bot_patterns=[], spam_patterns=[], spam_keywords=['c++', 'a.b'])
+    assert filters.spam_rule('I write c++ daily') == 'keyword:c++'
+    assert filters.spam_rule('cc daily and axb too') is None
+    assert filters.bot_rule('AutoModerator') is None
+
+def test_rules_reload_from_file(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'spam_keywords': ['crypto'], 'min_text_length': 2}))
+    filters = FilterEngine(rules_path=path)
+    assert filters.stats['reloads'] == 1
+    assert filters.spam_rule('buy crypto now') == 'keyword:crypto'
+    assert filters.spam_rule('ok') is None
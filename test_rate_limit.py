@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Rate limiter tests: a full bucket allows a burst without waiting, empty
+buckets refill at the configured rate, and requests larger than the burst
+leave the bucket in debt. Time is faked so nothing actually sleeps.
+"""
+
+import pytest
+
+from app.reddit import rate_limit
+from app.reddit.rate_limit import RateLimiter, listing_requests
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, 'time', clock)
+    return clock
+
+def test_burst_then_wait_for_refill(clock):
+    limiter = RateLimiter(requests_per_minute=60, burst=5)
+    assert [limiter.acquire() for _ in range(5)] == [0.0] * 5
+    # Empty bucket at one request per second
+    assert limiter.acquire() == pytest.approx(1.0)
+    assert limiter.stats['requests'] == 6
+
+def test_refill_is_capped_at_burst(clock):
+    limiter = RateLimiter(requests_per_minute=60, burst=5)
+    for _ in range(5):
+        limiter.acquire()
+    clock.now += 3
+    assert limiter.acquire(3) == 0.0
+    clock.now += 3600
+    limiter._refill(clock.now)
+    assert limiter.tokens == 5
+
+def test_request_above_burst_leaves_debt(clock):
+    limiter = RateLimiter(requests_per_minute=60, burst=5)
+    assert limiter.acquire(8) == 0.0
+    assert limiter.tokens == -3
+    # The next caller sleeps off the debt plus its own token
+    assert limiter.acquire() == pytest.approx(4.0)
+
+def test_listing_requests_per_page():
+    assert listing_requests(None) == 1
+    assert listing_requests(100) == 1
+    assert listing_requests(101) == 2
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Scheduler tests: poll intervals and page sizes follow the learned arrival
+rate but stay within their configured bounds.
+"""
+
+from app.core.scheduler import (
+    SCHEDULER_MAX_INTERVAL, SCHEDULER_MAX_PAGE, SCHEDULER_MIN_INTERVAL, SCHEDULER_MIN_PAGE,
+    SCHEDULER_TARGET_ITEMS, SubredditSchedule,
+)
+
+def schedule(posts=None, comments=None):
+    schedule = SubredditSchedule('test', 10, 20)
+    schedule.rates = {'posts': posts, 'comments': comments}
+    schedule.plan()
+    return schedule
+
+def test_unknown_rate_polls_at_max_interval():
+    s = schedule()
+    assert s.interval == SCHEDULER_MAX_INTERVAL
+    assert s.limits == {'posts': 10, 'comments': 20}
+
+def test_busy_subreddit_clamped_to_min_interval_and_max_page():
+    s = schedule(posts=1000.0, comments=1000.0)
+    assert s.interval == SCHEDULER_MIN_INTERVAL
+    assert s.limits == {'posts': SCHEDULER_MAX_PAGE, 'comments': SCHEDULER_MAX_PAGE}
+
+def test_quiet_subreddit_clamped_to_max_interval_and_min_page():
+    s = schedule(posts=1e-6)
+    assert s.interval == SCHEDULER_MAX_INTERVAL
+    assert s.limits['posts'] == SCHEDULER_MIN_PAGE
+
+def test_interval_follows_busier_listing():
+    rate = SCHEDULER_TARGET_ITEMS / ((SCHEDULER_MIN_INTERVAL + SCHEDULER_MAX_INTERVAL) / 2)
+    s = schedule(posts=rate / 10, comments=rate)
+    assert s.interval == SCHEDULER_TARGET_ITEMS / rate
+
+def test_stretch_never_exceeds_max_interval():
+    s = schedule(posts=1000.0)
+    s.plan(stretch=1e6)
+    assert s.interval == SCHEDULER_MAX_INTERVAL
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Hash ring tests: assignment is stable, and when a node joins or leaves only
+the subreddits that move to or from that node change owner.
+"""
+
+from app.reddit.sharding import HashRing
+
+SUBREDDITS = [f"sub{i}" for i in range(500)]
+
+def owners(ring):
+    return {name: ring.owner(name) for name in SUBREDDITS}
+
+def test_assignment_is_stable_and_spread():
+    before = owners(HashRing(['a', 'b', 'c']))
+    assert owners(HashRing(['c', 'a', 'b'])) == before
+    assert set(before.values()) == {'a', 'b', 'c'}
+    assert HashRing(['a', 'b', 'c']).owner('SUB1') == before['sub1']
+
+def test_node_join_moves_only_to_new_node():
+    before = owners(HashRing(['a', 'b', 'c']))
+    after = owners(HashRing(['a', 'b', 'c', 'd']))
+    moved = [name for name in SUBREDDITS if before[name] != after[name]]
+    assert moved
+    assert all(after[name] == 'd' for name in moved)
+    assert len(moved) < len(SUBREDDITS) / 2
+
+def test_node_leave_moves_only_its_subreddits():
+    before = owners(HashRing(['a', 'b', 'c']))
+    after = owners(HashRing(['a', 'b']))
+    for name in SUBREDDITS:
+        if before[name] != 'c':
+            assert after[name] == before[name]
+        else:
+            assert after[name] in ('a', 'b')
+
+def test_empty_ring_has_no_owner():
+    assert HashRing([]).owner('python') is None
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Watermark tests: items created in the same second as the watermark item
+must not be dropped, staged marks only move on commit, and subreddits whose
+fetch or storage failed keep their old marks.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.reddit.watermarks import WatermarkStore, is_newer
+
+def thing(fullname, created_utc, subreddit='a'):
+    return SimpleNamespace(
+        fullname=fullname, id=fullname.split('_', 1)[1], created_utc=created_utc,
+        subreddit=SimpleNamespace(display_name=subreddit), author='someone', body='a comment body',
+        title='a post title', selftext='', url='https://example.com', num_comments=0,
+        score=1, parent_id='t3_p', link_id='t3_p'
+    )
+
+def test_is_newer_same_second():
+    mark = {'fullname': 't1_c1', 'created_utc': 100}
+    assert not is_newer(thing('t1_c1', 100), mark)
+    assert is_newer(thing('t1_c3', 100), mark)
+    assert is_newer(thing('t1_c4', 101), mark)
+    assert not is_newer(thing('t1_c0', 99), mark)
+
+def test_commit_keeps_boundary_second():
+    store = WatermarkStore()
+    store.set('a', 'comments', 't1_c1', 100)
+    store.stage('a', 'comments', [thing('t1_c3', 100)], store.get('a', 'comments'))
+    assert store.commit(['a']) == 1
+    mark = store.get('a', 'comments')
+    assert set(mark['boundary']) == {'t1_c1', 't1_c3'}
+    assert not is_newer(thing('t1_c1', 100), mark)
+    assert not is_newer(thing('t1_c3', 100), mark)
+
+def test_fetch_group_keeps_same_second_items():
+    pytest.importorskip('praw')
+    pytest.importorskip('redis')
+    from app.reddit.fetcher import fetch_group
+    from app.reddit.rate_limit import RateLimiter
+
+    comments = [thing('t1_c3', 100, 'a'), thing('t1_c1', 100, 'a'), thing('t1_c0', 90, 'a')]
+    subreddit = SimpleNamespace(new=lambda limit: iter([]), comments=lambda limit: iter(comments[:limit]))
+    client = SimpleNamespace(subreddit=lambda name: subreddit)
+    store = WatermarkStore()
+    store.set('a', 'posts', 't3_p1', 50)
+    store.set('a', 'comments', 't1_c1', 100)
+
+    items = fetch_group(['a'], client, {'a': (10, 10)}, RateLimiter(requests_per_minute=6000, burst=100), store)
+    assert [item['id'] for item in items] == ['c3']
+
+def test_staged_mark_moves_only_on_commit():
+    store = WatermarkStore()
+    store.set('a', 'posts', 't3_p1', 100)
+    store.stage('a', 'posts', [thing('t3_p2', 110)], store.get('a', 'posts'))
+    assert store.get('a', 'posts')['fullname'] == 't3_p1'
+    assert store.commit(['a']) == 1
+    assert store.get('a', 'posts')['fullname'] == 't3_p2'
+    # Nothing left staged
+    assert store.commit(['a']) == 0
+
+def test_discarded_mark_never_commits():
+    store = WatermarkStore()
+    store.set('a', 'posts', 't3_p1', 100)
+    store.stage('a', 'posts', [thing('t3_p2', 110)], store.get('a', 'posts'))
+    assert store.discard(['a']) == 1
+    assert store.commit(['a']) == 0
+    assert store.get('a', 'posts')['fullname'] == 't3_p1'
+
+def test_failed_subreddit_keeps_old_mark():
+    # process_and_store: commit everything but the failed subreddits, discard those
+    store = WatermarkStore()
+    for name in ('a', 'b'):
+        store.set(name, 'posts', f't3_{name}1', 100)
+        store.stage(name, 'posts', [thing(f't3_{name}2', 110, name)], store.get(name, 'posts'))
+    failed = {'b'}
+    assert store.commit([name for name in ('a', 'b') if name not in failed]) == 1
+    assert store.discard(failed) == 1
+    assert store.get('a', 'posts')['fullname'] == 't3_a2'
+    assert store.get('b', 'posts')['fullname'] == 't3_b1'
+    assert store.commit(['b']) == 0
+
+def test_grouped_partial_failure_keeps_watermarks():
+    pytest.importorskip('praw')
+    pytest.importorskip('redis')
+    from app.reddit.fetcher import fetch_reddit_data
+
+    def comments(limit):
+        raise RuntimeError('503 from the comments listing')
+
+    subreddit = SimpleNamespace(new=lambda limit: iter([thing('t3_p9', 200, 'a')]), comments=comments)
+    client = SimpleNamespace(subreddit=lambda name: subreddit)
+    store = WatermarkStore()
+    store.set('a', 'posts', 't3_p1', 100)
+    store.set('a', 'comments', 't1_c1', 100)
+
+    failed = set()
+    items = list(fetch_reddit_data(['a'], client, concurrency=1, watermarks=store, mode='grouped', failed=failed))
+    # The posts listing staged t3_p9, but it was never yielded
+    assert items == []
+    assert failed == {'a'}
+    assert store.commit(['a']) == 0
+    assert store.get('a', 'posts')['fullname'] == 't3_p1'
+
+def listing_client(newest, before_pages, calls):
+    def new(limit):
+        calls.append('new')
+        return iter(newest[:limit])
+
+    def get(path, params):
+        calls.append('get')
+        return before_pages.pop(0) if before_pages else []
+
+    return SimpleNamespace(subreddit=lambda name: SimpleNamespace(new=new), get=get)
+
+def test_quiet_listing_costs_one_request():
+    pytest.importorskip('praw')
+    pytest.importorskip('redis')
+    from app.reddit.fetcher import fetch_listing
+    from app.reddit.rate_limit import RateLimiter
+
+    calls = []
+    client = listing_client([thing('t3_p1', 100), thing('t3_p0', 90)], [], calls)
+    store = WatermarkStore()
+    store.set('a', 'posts', 't3_p1', 100)
+    limiter = RateLimiter(requests_per_minute=6000, burst=100)
+
+    assert fetch_listing('a', 'posts', client, 10, limiter, store) == []
+    assert calls == ['new']
+    assert limiter.stats['requests'] == 1
+
+def test_full_listing_walks_forward_from_watermark():
+    pytest.importorskip('praw')
+    pytest.importorskip('redis')
+    from app.reddit.fetcher import fetch_listing
+    from app.reddit.rate_limit import RateLimiter
+
+    calls = []
+    # Both newest items are past the mark, so t3_p2 and t3_p3 may sit in between
+    client = listing_client([thing('t3_p5', 150), thing('t3_p4', 140)],
+                            [[thing('t3_p3', 130), thing('t3_p2', 120)]], calls)
+    store = WatermarkStore()
+    store.set('a', 'posts', 't3_p1', 100)
+
+    items = fetch_listing('a', 'posts', client, 2, RateLimiter(requests_per_minute=6000, burst=100), store)
+    assert [item.fullname for item in items] == ['t3_p3', 't3_p2']
+    assert calls == ['new', 'get']
+
+def test_fetch_stats_count_requests_made():
+    pytest.importorskip('praw')
+    pytest.importorskip('redis')
+    from app.reddit.fetcher import fetch_reddit_data, get_fetch_stats
+
+    subreddit = SimpleNamespace(new=lambda limit: iter([thing('t3_p1', 100)]),
+                                comments=lambda limit: iter([thing('t1_c1', 100)]))
+    client = SimpleNamespace(subreddit=lambda name: subreddit)
+    store = WatermarkStore()
+    store.set('a', 'posts', 't3_p1', 100)
+    store.set('a', 'comments', 't1_c1', 100)
+
+    assert list(fetch_reddit_data(['a'], client, concurrency=1, watermarks=store, mode='subreddit')) == []
+    # A quiet subreddit costs one newest page per listing
+    assert get_fetch_stats()['requests'] == 2